@@ -1,23 +1,26 @@
 from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from conversation_memory import ConversationMemory
 
 llm = ChatOllama(
     model="llama3",
     max_tokens=100,
+    keep_alive="30m",  # keep the model, and the cached prompt prefix, loaded between turns
     temperature=0.7,
     n=2
 )
 
-messages = []
+# Recent turns within a token budget + a rolling summary of older ones
+memory = ConversationMemory(llm)
 
 while True:
     prompt = input("User: ")
     if prompt.lower() == "exit":
         break
 
-    messages.append(HumanMessage(content=prompt))
-    response = llm.invoke(messages)
-    messages.append(AIMessage(content=response.content))
+    memory.add(HumanMessage(content=prompt))
+    response = llm.invoke(memory.messages())
+    memory.add(AIMessage(content=response.content))
 
     print("Bot:", response.content)
 
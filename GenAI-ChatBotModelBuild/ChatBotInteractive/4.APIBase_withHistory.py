@@ -1,13 +1,21 @@
+import re
+import uuid
+
 from flask import Flask, request, jsonify, render_template
 from langchain_ollama import ChatOllama
 from langchain_core.messages import SystemMessage, HumanMessage, AIMessage
+from session_store import SessionStore
 
 llm = ChatOllama(
     model="llama3",
     max_tokens=100,
+    keep_alive="30m",  # keep the model, and the cached prompt prefix, loaded between turns
 )
 
-messages = []
+# One conversation per user: recent turns + a rolling summary, idle ones spilled to disk
+store = SessionStore(llm)
+SESSION_COOKIE = "chat_session"
+SESSION_ID = re.compile(r"[A-Za-z0-9_-]{16,64}")
 
 app = Flask(__name__)
 
@@ -23,13 +31,26 @@ def chat():
     data = request.get_json()
     user_message = data.get('message', '')
 
-    print("******** User message : "+user_message)
-    return jsonify({'response': get_response(user_message)})
+    # Session from the X-Session-ID header (API clients) or the cookie (browser); new if neither is valid
+    session_id = request.headers.get('X-Session-ID') or request.cookies.get(SESSION_COOKIE) or ''
+    if not SESSION_ID.fullmatch(session_id):
+        session_id = uuid.uuid4().hex
 
-def get_response(prompt):
-    messages.append(HumanMessage(content=prompt))
-    response = llm.invoke(messages)
-    messages.append(AIMessage(content=response.content))
+    print("******** User message : "+user_message)
+    response = jsonify({'response': get_response(session_id, user_message), 'session_id': session_id})
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=30 * 24 * 3600, httponly=True, samesite='Lax')
+    return response
+
+def get_response(session_id, prompt):
+    with store.session(session_id) as memory:
+        memory.add(HumanMessage(content=prompt))
+        response = llm.invoke(memory.messages())
+        memory.add(AIMessage(content=response.content))
     return response.content
 
-app.run("0.0.0.0", port=5400, debug=True)
\ No newline at end of file
+@app.route('/sessions/stats', methods=['GET'])
+def session_stats():
+    return jsonify(store.report())
+
+if __name__ == "__main__":
+    app.run("0.0.0.0", port=5400, debug=True)
\ No newline at end of file
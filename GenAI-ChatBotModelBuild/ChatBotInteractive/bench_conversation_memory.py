@@ -0,0 +1,75 @@
+"""Per-turn latency over a long chat: full history vs ConversationMemory.
+
+Plays the same scripted TURNS-turn conversation twice against Ollama:
+once sending the whole message list every turn (as the scripts used to),
+once through ConversationMemory. Prints prompt size and reply latency at
+checkpoints, and the mean of the first and last 20 turns.
+
+    python bench_conversation_memory.py        # TURNS=200, OLLAMA_MODEL=llama3
+"""
+import os
+import sys
+import time
+
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage, AIMessage
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from conversation_memory import ConversationMemory, estimate_tokens
+
+TURNS = int(os.getenv("TURNS", "200"))
+MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+CHECKPOINTS = [1, 25, 50, 100, 150, 200]
+TOPICS = ["my garden", "the trip to Pune", "our database migration", "the book club", "my running plan"]
+
+
+def user_turn(i):
+    topic = TOPICS[i % len(TOPICS)]
+    return (f"Turn {i}: a quick note about {topic}. Detail number {i} is that item {i * 7 % 50} "
+            f"is due on day {i % 28 + 1}. Please acknowledge in one short sentence.")
+
+
+def play(llm, memory=None):
+    history = []
+    rows = []
+    for i in range(1, TURNS + 1):
+        message = HumanMessage(content=user_turn(i))
+        if memory is not None:
+            memory.add(message)
+            prompt = memory.messages()
+        else:
+            history.append(message)
+            prompt = history
+        start = time.perf_counter()
+        reply = llm.invoke(prompt).content
+        latency = time.perf_counter() - start
+        rows.append((sum(map(estimate_tokens, prompt)), latency))
+        if memory is not None:
+            memory.add(AIMessage(content=reply))
+        else:
+            history.append(AIMessage(content=reply))
+    return rows
+
+
+def main():
+    llm = ChatOllama(model=MODEL, num_predict=40)
+    llm.invoke("Hi")  # load the model first, so turn 1 of the first run isn't timing the load
+    full = play(llm)
+    memory = ConversationMemory(llm)
+    bounded = play(llm, memory)
+    memory.wait()
+
+    print(f"{'turn':>5}{'full: tokens':>14}{'latency s':>11}{'memory: tokens':>16}{'latency s':>11}")
+    for turn in [t for t in CHECKPOINTS if t <= TURNS]:
+        (ft, fl), (mt, ml) = full[turn - 1], bounded[turn - 1]
+        print(f"{turn:>5}{ft:>14}{fl:>11.2f}{mt:>16}{ml:>11.2f}")
+    window = min(20, TURNS)
+    for name, rows in (("full history", full), ("memory", bounded)):
+        first = sum(l for _, l in rows[:window]) / window
+        last = sum(l for _, l in rows[-window:]) / window
+        print(f"{name:<13} mean latency first {window} turns {first:.2f}s, last {window} turns {last:.2f}s")
+    print(memory.report())
+
+
+if __name__ == "__main__":
+    main()
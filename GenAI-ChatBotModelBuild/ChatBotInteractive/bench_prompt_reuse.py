@@ -0,0 +1,91 @@
+"""Prefill tokens and time to first token per turn: previous vs current ConversationMemory.
+
+Ollama keeps the KV state of the last prompt it processed and, on the next
+request, only prefills the tokens after the longest prefix they share
+(prompt_eval_count counts just those). ConversationMemory's prompt is
+summary + not-yet-summarised lines + window, so between summary refreshes
+each prompt already extended the previous one; only a refresh rewrites its
+front. The same scripted TURNS-turn conversation runs twice:
+- previous: the eviction as it was before, which could leave the window
+  starting on an assistant reply
+- current: eviction always leaves the window starting on a user turn
+
+Expect the two to be close: the prompt layout was already prefix-stable.
+Turns right after a summary refresh are marked *. The keep_alive the chat
+scripts now pass only matters after more than 5 idle minutes (Ollama's
+default), which this benchmark doesn't wait for.
+
+    python bench_prompt_reuse.py             # TURNS=40, OLLAMA_MODEL=llama3
+    OLLAMA_NUM_PARALLEL=2 ollama serve       # so summary calls don't evict the chat's cache
+"""
+import os
+import sys
+import time
+
+from langchain_ollama import ChatOllama
+from langchain_core.messages import HumanMessage, AIMessage
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from conversation_memory import ConversationMemory, EVICT_TO, estimate_tokens, summary_executor
+
+TURNS = int(os.getenv("TURNS", "40"))
+MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+
+
+class PreviousMemory(ConversationMemory):
+    def _evict(self):
+        # As before: drop from the front down to the target, wherever that leaves the window
+        target = self.window_tokens * EVICT_TO
+        size = sum(map(estimate_tokens, self.window))
+        while len(self.window) > 1 and size > target:
+            message = self.window.pop(0)
+            size -= estimate_tokens(message)
+            self.evicted.append(message)
+        if self.refreshing is None:
+            self.refreshing = summary_executor.submit(self._refresh)
+
+
+def user_turn(i):
+    return f"Turn {i}: item {i * 7 % 50} is due on day {i % 28 + 1}. Please acknowledge in one short sentence."
+
+
+def play(llm, memory):
+    rows = []
+    for i in range(1, TURNS + 1):
+        memory.add(HumanMessage(content=user_turn(i)))
+        resets = memory.stats["prefix_resets"]
+        prompt = memory.messages()
+        start = time.perf_counter()
+        first_token = None
+        reply = None
+        for chunk in llm.stream(prompt):
+            if first_token is None and chunk.content:
+                first_token = time.perf_counter() - start
+            reply = chunk if reply is None else reply + chunk
+        meta = reply.response_metadata
+        rows.append((meta.get("prompt_eval_count", 0), meta.get("prompt_eval_duration", 0) / 1e6,
+                     (first_token or 0) * 1000, memory.stats["prefix_resets"] > resets))
+        memory.add(AIMessage(content=reply.content))
+    memory.wait()
+    return rows, memory.report()
+
+
+def main():
+    llm = ChatOllama(model=MODEL, num_predict=30, keep_alive="30m")
+    llm.invoke("Hi")  # load the model first
+    previous, previous_report = play(llm, PreviousMemory(llm))
+    current, current_report = play(llm, ConversationMemory(llm))
+
+    print(f"{'':>5}{'previous':>30}{'current':>32}")
+    print(f"{'turn':>5}" + f"{'prefill tok':>12}{'prefill ms':>11}{'TTFT ms':>9}  " * 2)
+    for turn, (a, b) in enumerate(zip(previous, current), 1):
+        print(f"{turn:>5}{a[0]:>12}{a[1]:>11.0f}{a[2]:>9.0f}{' *' if a[3] else '  '}"
+              f"{b[0]:>12}{b[1]:>11.0f}{b[2]:>9.0f}{' *' if b[3] else ''}")
+    for name, rows, report in (("previous", previous, previous_report), ("current", current, current_report)):
+        print(f"{name:<9} prefill tokens {sum(r[0] for r in rows):>7}, "
+              f"mean TTFT {sum(r[2] for r in rows) / len(rows):.0f} ms, "
+              f"{report['prefix_resets']} prefix resets, {report['summaries']} summaries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Multi-user load test of SessionStore: isolation, spill/reload, memory at 10k sessions.
+
+USERS simulated users (default 10000) each hold a TURNS-turn conversation.
+Every round, each user adds one exchange from one of THREADS threads, in
+shuffled order. Every message carries the user's own secret, so a session
+holding a line of anyone else's conversation shows up as a leak. The
+assistant's reply is written directly (no model calls), so only the
+store is measured.
+
+Checks, each configuration in a fresh process:
+- every session holds exactly its own TURNS exchanges, in order
+- a new store opened on the same log after flush() has every session
+- RSS with the default hot cap, against keeping all sessions in memory
+
+    python check_session_store.py
+    USERS=2000 python check_session_store.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+USERS = int(os.getenv("USERS", "10000"))
+TURNS = int(os.getenv("TURNS", "3"))
+THREADS = int(os.getenv("THREADS", "32"))
+
+CONFIGS = [
+    ("all sessions kept in memory", {"max_hot": USERS * 2, "idle_seconds": 1e9}),
+    ("SessionStore defaults", {}),
+    ("max_hot=100", {"max_hot": 100}),
+]
+
+
+def rss_mb():
+    with open("/proc/self/statm") as statm:
+        return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def child(overrides):
+    from langchain_core.messages import HumanMessage, AIMessage
+    from session_store import SessionStore
+
+    path = os.path.join(tempfile.mkdtemp(), "sessions.jsonl")
+    secrets = {f"user-{n:05d}-{os.urandom(4).hex()}": os.urandom(8).hex() for n in range(USERS)}
+    before = rss_mb()
+    store = SessionStore(None, path=path, **overrides)
+
+    def turn(user, k):
+        with store.session(user) as memory:
+            memory.add(HumanMessage(content=f"{user} turn {k}: my secret is {secrets[user]}"))
+            memory.add(AIMessage(content=f"Noted, {user}: {secrets[user]} (turn {k})"))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(THREADS) as executor:
+        for k in range(TURNS):
+            users = list(secrets)
+            random.shuffle(users)
+            list(executor.map(turn, users, [k] * len(users)))
+    elapsed = time.perf_counter() - start
+    after = rss_mb()
+    report = store.report()
+
+    def leaks(store):
+        bad = 0
+        for user, secret in secrets.items():
+            with store.session(user) as memory:
+                lines = [m.content for m in memory.messages()]
+            expected = [line for k in range(TURNS) for line in
+                        (f"{user} turn {k}: my secret is {secret}", f"Noted, {user}: {secret} (turn {k})")]
+            bad += lines != expected
+        return bad
+
+    bad = leaks(store)
+    store.flush()
+    bad_after_restart = leaks(SessionStore(None, path=path, **overrides))
+    print(json.dumps({
+        "turns_per_second": USERS * TURNS / elapsed,
+        "rss_growth_mb": after - before,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "hot_sessions": report["hot_sessions"],
+        "log_mb": report["log_bytes"] / 2**20,
+        "spills": report["spills"],
+        "loads": report["loads"],
+        "bad_sessions": bad,
+        "bad_after_restart": bad_after_restart,
+    }))
+
+
+def main():
+    print(f"{USERS} users x {TURNS} turns, {THREADS} threads")
+    print(f"{'configuration':<30}{'turns/s':>9}{'hot':>7}{'RSS +MB':>9}{'log MB':>8}{'loads':>8}{'bad':>5}"
+          f"{'bad after restart':>19}")
+    failed = False
+    for name, overrides in CONFIGS:
+        proc = subprocess.run([sys.executable, __file__, "--child", json.dumps(overrides)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{name:<30} failed:\n{proc.stderr.strip()[-2000:]}")
+            sys.exit(1)
+        r = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:<30}{r['turns_per_second']:>9.0f}{r['hot_sessions']:>7}{r['rss_growth_mb']:>9.1f}"
+              f"{r['log_mb']:>8.1f}{r['loads']:>8}{r['bad_sessions']:>5}{r['bad_after_restart']:>19}")
+        failed = failed or r["bad_sessions"] or r["bad_after_restart"]
+    print("FAILED: some sessions held the wrong conversation" if failed else "OK: every session isolated")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(json.loads(sys.argv[2]))
+    else:
+        main()
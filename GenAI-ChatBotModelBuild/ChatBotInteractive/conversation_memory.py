@@ -0,0 +1,180 @@
+"""Token-budgeted chat history: recent turns verbatim, older turns as a summary.
+
+Sending the whole history every turn makes each prompt, and so each
+reply, slower than the last. ConversationMemory keeps the most recent
+messages within a token budget. When they outgrow it, the oldest ones
+move out of the window and a background thread folds them into a running
+summary with one extra LLM call. The summary is updated incrementally
+(old summary + evicted lines -> new summary), so its cost doesn't grow
+either.
+
+Until a refresh finishes, the evicted messages are still sent verbatim,
+so nothing drops out of the prompt in the meantime. The prompt stays
+around CHAT_MEMORY_TOKENS whatever the length of the conversation.
+
+The layout is also prefix-stable, so Ollama's prompt cache does most of
+the work: between summary refreshes, each prompt is the previous one plus
+the new turn, and Ollama only prefills the tokens after the longest
+prefix it already holds. Only a refresh rewrites the front of the prompt
+(counted as prefix_resets). The summary calls are prompts too: give them
+their own Ollama slot (OLLAMA_NUM_PARALLEL >= 2) or a separate summarizer
+model, or they push the chat's prefix out of the cache.
+
+    memory = ConversationMemory(llm)
+    memory.add(HumanMessage(content=prompt))
+    response = llm.invoke(memory.messages())
+    memory.add(AIMessage(content=response.content))
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import threading
+
+from langchain_core.messages import SystemMessage, HumanMessage, messages_to_dict, messages_from_dict
+
+CHAT_MEMORY_TOKENS = int(os.getenv("CHAT_MEMORY_TOKENS", "1500"))
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "250"))
+CHAT_SUMMARY_WORKERS = int(os.getenv("CHAT_SUMMARY_WORKERS", "2"))
+# Evict down to this share of the window budget, so a summary isn't triggered every turn
+EVICT_TO = 0.6
+
+SUMMARY_PROMPT = """Update the running summary of a conversation between a user and an assistant.
+Keep names, facts, preferences, decisions and open questions; drop small talk.
+Answer with the updated summary only, in under {words} words.
+
+Current summary:
+{summary}
+
+New lines:
+{lines}
+
+Updated summary:"""
+
+
+def estimate_tokens(message):
+    """Rough token count (~4 characters per token, plus the role overhead)."""
+    return len(message.content) // 4 + 4
+
+
+# Shared by every ConversationMemory, so thousands of sessions don't mean thousands of threads
+summary_executor = ThreadPoolExecutor(max_workers=CHAT_SUMMARY_WORKERS, thread_name_prefix="memory-summary")
+
+
+class ConversationMemory:
+    def __init__(self, llm, max_tokens=CHAT_MEMORY_TOKENS, summary_tokens=CHAT_SUMMARY_TOKENS, summarizer=None):
+        self.summarizer = summarizer or llm
+        self.summary_tokens = summary_tokens
+        self.window_tokens = max_tokens - summary_tokens
+        self.summary = ""
+        self.summary_message = None  # reused as-is, so the prompt's front only changes with the summary
+        self.window = []    # recent messages, sent verbatim
+        self.evicted = []   # out of the window, not yet in the summary
+        self.lock = threading.Lock()
+        self.refreshing = None  # Future of the summary refresh in progress (at most one per memory)
+        self.last_prompt = []
+        self.stats = {"messages": 0, "summaries": 0, "summary_failures": 0, "summarized_messages": 0,
+                      "prefix_resets": 0}
+
+    def add(self, message):
+        with self.lock:
+            self.window.append(message)
+            self.stats["messages"] += 1
+            if sum(map(estimate_tokens, self.window)) > self.window_tokens:
+                self._evict()
+
+    def _evict(self):
+        # Drop whole exchanges from the front (the window starts on a user turn), always leaving the newest message
+        target = self.window_tokens * EVICT_TO
+        size = sum(map(estimate_tokens, self.window))
+        while len(self.window) > 1 and (size > target or not isinstance(self.window[0], HumanMessage)):
+            message = self.window.pop(0)
+            size -= estimate_tokens(message)
+            self.evicted.append(message)
+        if self.refreshing is None:
+            self.refreshing = summary_executor.submit(self._refresh)
+
+    def _refresh(self):
+        # Each summarised batch is published straight away (one prefix reset per batch), so lines
+        # evicted while a summary call runs never pile up in the prompt; the next call folds them in
+        while True:
+            with self.lock:
+                batch = list(self.evicted)
+                summary = self.summary
+                if not batch:
+                    self.refreshing = None
+                    return
+            lines = "\n".join(f"{'User' if isinstance(m, HumanMessage) else 'Assistant'}: {m.content}"
+                              for m in batch)
+            prompt = SUMMARY_PROMPT.format(words=self.summary_tokens * 3 // 4, summary=summary or "(none yet)",
+                                           lines=lines)
+            try:
+                new_summary = self.summarizer.invoke([HumanMessage(content=prompt)]).content.strip()
+            except Exception:
+                # Keep the lines verbatim and try again with the next eviction
+                with self.lock:
+                    self.stats["summary_failures"] += 1
+                    self.refreshing = None
+                return
+            with self.lock:
+                self.summary = new_summary
+                self.summary_message = self._summary_message(new_summary)
+                del self.evicted[:len(batch)]
+                self.stats["summaries"] += 1
+                self.stats["summarized_messages"] += len(batch)
+
+    @staticmethod
+    def _summary_message(summary):
+        return SystemMessage(content=f"Summary of the earlier conversation: {summary}")
+
+    def _layout(self):
+        prefix = [self.summary_message] if self.summary_message else []
+        return prefix + self.evicted + self.window
+
+    def messages(self):
+        """What to send to the model: summary, not-yet-summarised lines, recent window."""
+        with self.lock:
+            prompt = self._layout()
+            # Does this prompt still extend the last one? If not, Ollama re-prefills it from the change on
+            last = self.last_prompt
+            if len(prompt) < len(last) or any(a is not b for a, b in zip(last, prompt)):
+                self.stats["prefix_resets"] += 1
+            self.last_prompt = prompt
+            return prompt
+
+    def prompt_tokens(self):
+        with self.lock:
+            return sum(map(estimate_tokens, self._layout()))
+
+    def wait(self):
+        """Block until any background summary refresh has finished (tests, shutdown)."""
+        while True:
+            with self.lock:
+                future = self.refreshing
+            if future is None:
+                return
+            future.result()
+
+    def size(self):
+        """Characters held: what a session store counts against its memory cap."""
+        with self.lock:
+            return len(self.summary) + sum(len(m.content) for m in self.evicted + self.window)
+
+    def to_dict(self):
+        """JSON-ready state; lines waiting for a summary are kept verbatim."""
+        with self.lock:
+            return {"summary": self.summary, "evicted": messages_to_dict(self.evicted),
+                    "window": messages_to_dict(self.window), "stats": dict(self.stats)}
+
+    @classmethod
+    def from_dict(cls, llm, data, **kwargs):
+        memory = cls(llm, **kwargs)
+        memory.summary = data["summary"]
+        memory.summary_message = cls._summary_message(data["summary"]) if data["summary"] else None
+        memory.evicted = messages_from_dict(data["evicted"])
+        memory.window = messages_from_dict(data["window"])
+        memory.stats.update(data["stats"])
+        return memory
+
+    def report(self):
+        with self.lock:
+            return {**self.stats, "window_messages": len(self.window), "pending_messages": len(self.evicted),
+                    "summary_tokens": len(self.summary) // 4}
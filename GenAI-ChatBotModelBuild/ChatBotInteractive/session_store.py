@@ -0,0 +1,188 @@
+"""Per-user conversations for the chat API: hot ones in memory, idle ones on disk.
+
+Each session id maps to its own ConversationMemory.
+- Hot sessions sit in an in-memory LRU, capped by count
+  (SESSION_MAX_HOT) and by the characters they hold (SESSION_HOT_CHARS).
+- A session idle for SESSION_IDLE_SECONDS, or pushed out by the caps,
+  is spilled to an append-only JSONL log (SESSION_LOG). The log's byte
+  offset and length are kept in an in-memory index, so loading a session
+  back is one seek and one read.
+- Spilled sessions beyond SESSION_MAX_SESSIONS are forgotten, least
+  recently used first.
+- The log is compacted once most of it is stale records, and the index
+  is rebuilt from it at startup.
+
+    store = SessionStore(llm)
+    with store.session(session_id) as memory:
+        ...  # the session can't be spilled while it is in use
+"""
+from collections import OrderedDict
+from contextlib import contextmanager
+import atexit
+import json
+import os
+import threading
+import time
+
+from conversation_memory import ConversationMemory
+
+SESSION_LOG = os.getenv("SESSION_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), "sessions.jsonl"))
+SESSION_MAX_HOT = int(os.getenv("SESSION_MAX_HOT", "1000"))
+SESSION_HOT_CHARS = int(os.getenv("SESSION_HOT_CHARS", str(50_000_000)))  # ~50 MB of text
+SESSION_IDLE_SECONDS = float(os.getenv("SESSION_IDLE_SECONDS", "600"))
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "100000"))
+# Compact when the log is at least this big and less than half of it is live
+COMPACT_MIN_BYTES = 1_000_000
+
+
+class HotSession:
+    __slots__ = ("memory", "last_used", "size", "users")
+
+    def __init__(self, memory):
+        self.memory = memory
+        self.last_used = time.monotonic()
+        self.size = memory.size()  # as of the last time the session was released
+        self.users = 0
+
+
+class SessionStore:
+    def __init__(self, llm, path=SESSION_LOG, max_hot=SESSION_MAX_HOT, hot_chars=SESSION_HOT_CHARS,
+                 idle_seconds=SESSION_IDLE_SECONDS, max_sessions=SESSION_MAX_SESSIONS):
+        self.llm = llm
+        self.path = path
+        self.max_hot = max_hot
+        self.hot_chars = hot_chars
+        self.idle_seconds = idle_seconds
+        self.max_sessions = max_sessions
+        self.hot = OrderedDict()    # session id -> HotSession, least recently used first
+        self.hot_chars_used = 0
+        self.index = OrderedDict()  # session id -> (offset, length) in the log, least recently spilled first
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "hits": 0, "loads": 0, "spills": 0, "dropped": 0, "compactions": 0}
+        self._open_log()
+        atexit.register(self.flush)
+
+    def _open_log(self):
+        # The last record for an id wins; a record without "state" marks a dropped session
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as log:
+                offset = 0
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break  # torn write at the end; everything before it is good
+                    self.index.pop(record["id"], None)
+                    if "state" in record:
+                        self.index[record["id"]] = (offset, len(line))
+                    offset += len(line)
+            with open(self.path, "r+b") as log:
+                log.truncate(offset)
+        self.log = open(self.path, "ab")
+        self.live_bytes = sum(length for _, length in self.index.values())
+
+    @contextmanager
+    def session(self, session_id):
+        """The session's ConversationMemory (from memory, from the log or new), pinned while in use."""
+        with self.lock:
+            entry = self.hot.pop(session_id, None)
+            if entry is not None:
+                self.stats["hits"] += 1
+            elif session_id in self.index:
+                memory = ConversationMemory.from_dict(self.llm, self._read(session_id)["state"])
+                entry = HotSession(memory)
+                self.hot_chars_used += entry.size
+                self.stats["loads"] += 1
+            else:
+                entry = HotSession(ConversationMemory(self.llm))
+                self.stats["created"] += 1
+            self.hot[session_id] = entry
+            entry.users += 1
+        try:
+            yield entry.memory
+        finally:
+            size = entry.memory.size()
+            with self.lock:
+                entry.users -= 1
+                entry.last_used = time.monotonic()
+                self.hot_chars_used += size - entry.size
+                entry.size = size
+                self._spill_idle(entry.last_used)
+
+    def _read(self, session_id):
+        offset, length = self.index[session_id]
+        self.log.flush()
+        with open(self.path, "rb") as log:
+            log.seek(offset)
+            return json.loads(log.read(length))
+
+    def _append(self, record):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        offset = self.log.tell()
+        self.log.write(line)
+        return offset, len(line)
+
+    def _spill_idle(self, now):
+        # The LRU's front is the least recently used: stop at the first one that may stay
+        spill = []
+        count, chars = len(self.hot), self.hot_chars_used
+        for session_id, entry in self.hot.items():
+            if count <= self.max_hot and chars <= self.hot_chars and now - entry.last_used <= self.idle_seconds:
+                break
+            if entry.users == 0:
+                spill.append(session_id)
+                count -= 1
+                chars -= entry.size
+        for session_id in spill:
+            self._spill(session_id)
+
+    def _spill(self, session_id):
+        entry = self.hot.pop(session_id)
+        self.hot_chars_used -= entry.size
+        self._forget(session_id)
+        self.index[session_id] = self._append({"id": session_id, "state": entry.memory.to_dict()})
+        self.live_bytes += self.index[session_id][1]
+        self.stats["spills"] += 1
+        while len(self.index) > self.max_sessions:
+            oldest = next(iter(self.index))
+            self._forget(oldest)
+            self._append({"id": oldest})
+            self.stats["dropped"] += 1
+        if self.log.tell() >= COMPACT_MIN_BYTES and self.live_bytes * 2 < self.log.tell():
+            self._compact()
+
+    def _forget(self, session_id):
+        if session_id in self.index:
+            self.live_bytes -= self.index.pop(session_id)[1]
+
+    def _compact(self):
+        # Copy the live records to a new log in index order, then swap it in
+        self.log.flush()
+        index = OrderedDict()
+        offset = 0
+        with open(self.path, "rb") as old, open(self.path + ".tmp", "wb") as new:
+            for session_id, (start, length) in self.index.items():
+                old.seek(start)
+                new.write(old.read(length))
+                index[session_id] = (offset, length)
+                offset += length
+        self.log.close()
+        os.replace(self.path + ".tmp", self.path)
+        self.index = index
+        self.live_bytes = offset
+        self.log = open(self.path, "ab")
+        self.stats["compactions"] += 1
+
+    def flush(self):
+        """Spill every hot session (shutdown), so conversations survive a restart."""
+        with self.lock:
+            for session_id, entry in list(self.hot.items()):
+                if entry.users == 0:
+                    self._spill(session_id)
+            self.log.flush()
+
+    def report(self):
+        with self.lock:
+            return {**self.stats, "hot_sessions": len(self.hot), "spilled_sessions": len(self.index),
+                    "hot_chars": self.hot_chars_used,
+                    "log_bytes": self.log.tell(), "live_log_bytes": self.live_bytes}
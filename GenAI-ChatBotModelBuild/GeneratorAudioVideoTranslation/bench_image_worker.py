@@ -0,0 +1,76 @@
+"""Seconds per image and peak RSS for the resident Stable Diffusion worker.
+
+Each configuration runs in a fresh process (peak RSS only ever grows),
+loads the pipeline once and then times IMAGES generations:
+- baseline: the original script's settings (default scheduler, 20 steps,
+  torch's default threads)
+- then each CPU optimization added on top, ending at the worker defaults
+
+    python bench_image_worker.py            # SD_MODEL, SD_SIZE etc. apply
+    IMAGES=1 SD_SIZE=384 python bench_image_worker.py
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+IMAGES = int(os.getenv("IMAGES", "3"))
+
+CONFIGS = [
+    ("baseline (default scheduler, 20 steps)",
+     {"scheduler": "default", "steps": 20, "attention_slicing": False, "channels_last": False,
+      "threads": None, "interop_threads": None}),
+    ("+ DPM-Solver++, SD_STEPS steps",
+     {"attention_slicing": False, "channels_last": False, "threads": None, "interop_threads": None}),
+    ("+ attention slicing",
+     {"channels_last": False, "threads": None, "interop_threads": None}),
+    ("+ channels-last", {"threads": None, "interop_threads": None}),
+    ("+ thread tuning (worker defaults)", {}),
+]
+
+
+def child(overrides):
+    import torch
+    from image_worker import DiffusionWorker
+
+    # None = leave torch's own choice, as the original script did
+    if overrides.get("threads", 0) is None:
+        overrides["threads"] = torch.get_num_threads()
+    if overrides.get("interop_threads", 0) is None:
+        overrides["interop_threads"] = torch.get_num_interop_threads()
+    worker = DiffusionWorker(**overrides).start()
+    worker.wait_ready()
+    start = time.perf_counter()
+    for i in range(IMAGES):
+        worker.generate(f"cinematic photo of a lighthouse at dusk, variation {i}")
+    per_image = (time.perf_counter() - start) / IMAGES
+    print(json.dumps({
+        "load_seconds": worker.stats["load_seconds"],
+        "seconds_per_image": per_image,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "steps": worker.steps,
+    }))
+
+
+def main():
+    print(f"{'configuration':<42}{'steps':>6}{'load s':>8}{'s/image':>9}{'peak RSS MB':>13}")
+    for name, overrides in CONFIGS:
+        proc = subprocess.run([sys.executable, __file__, "--child", json.dumps(overrides)],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{name:<42} failed:\n{proc.stderr.strip()[-2000:]}")
+            return
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(f"{name:<42}{result['steps']:>6}{result['load_seconds']:>8.1f}"
+              f"{result['seconds_per_image']:>9.2f}{result['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--child":
+        child(json.loads(sys.argv[2]))
+    else:
+        main()
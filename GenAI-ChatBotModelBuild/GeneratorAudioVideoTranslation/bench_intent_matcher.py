@@ -0,0 +1,128 @@
+"""Parity check and 100 KB benchmark for the intent matcher.
+
+First compares IntentMatcher against the original keyword/regex
+detect_action on hand-written edge cases and on random prompts built from
+keyword fragments (exits non-zero on any difference), both as shipped
+(the shipped table is small, so it scans per keyword) and with the
+compiled regex forced. Then times the old function and both paths on
+100 KB prompts, including one full of "from " that makes the old
+`from .* to .*` regex backtrack, and a 200-keyword table against one
+substring scan per keyword.
+
+    python bench_intent_matcher.py
+"""
+import os
+import random
+import re
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from intent_matcher import IntentMatcher
+
+RANDOM_CASES = 20000
+PROMPT_SIZE = 100_000
+
+
+def legacy_detect_action(prompt: str):
+    """detect_action as it was before the compiled matcher."""
+    norm = prompt.lower()
+    if any(k in norm for k in ["image", "draw", "photo", "picture", "illustrate"]):
+        return "IMAGE"
+    elif any(k in norm for k in ["audio", "text to speech", "tts", "convert to audio", "speak"]):
+        return "AUDIO"
+    elif "translate" in norm or "translation" in norm or re.search(r"from .* to .*", norm):
+        return "TRANSLATION"
+    else:
+        return "TEXT"
+
+
+EDGE_CASES = [
+    "", "hello", "Draw a cat", "DRAWER", "withdraw money", "imagery", "speaker notes", "watts",
+    "Text To Speech please", "convert to audio", "ttspeak", "translation", "TRANSLATE this",
+    "from here to there", "from here to", "from  to x", "from to x", "fromage to go",
+    "from a\nto b", "from a \n to b", "x from a to b\nimage", "wherefrom x to y",
+    "from a\r to b", "from a  to b", "Translate from English to Marathi",
+    "illustrate the audio", "photograph", "picturesque speak", "tts image",
+]
+FRAGMENTS = ["image", "draw", "photo", "picture", "illustrate", "audio", "text to speech", "tts",
+             "convert to audio", "speak", "translate", "translation", "from ", " to ", "from", "to",
+             "\n", " ", "x", "t", "s", "IMAGE", "Speak", "fro", "m ", "trans", "late", "ima", "ge"]
+
+
+def check_parity(matcher, name):
+    rng = random.Random(0)
+    cases = EDGE_CASES + ["".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 12)))
+                          for _ in range(RANDOM_CASES)]
+    mismatches = [c for c in cases if matcher.detect(c) != legacy_detect_action(c)]
+    for case in mismatches[:10]:
+        print(f"  MISMATCH {case!r}: new={matcher.detect(case)} old={legacy_detect_action(case)}")
+    print(f"parity ({name}): {len(cases) - len(mismatches)}/{len(cases)} prompts agree")
+    return not mismatches
+
+
+def filler(size, rng, words):
+    out, length = [], 0
+    while length < size:
+        word = rng.choice(words)
+        out.append(word)
+        length += len(word) + 1
+    return " ".join(out)
+
+
+def timed(func, prompt, budget=2.0):
+    runs, start = 0, time.perf_counter()
+    while True:
+        func(prompt)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > budget or runs >= 50000:
+            return elapsed / runs
+
+
+def benchmark(matcher, compiled):
+    rng = random.Random(1)
+    plain_words = "the quick brown fox jumps over a lazy dog while notes pile up on the desk".split()
+    prompts = {
+        "plain text": filler(PROMPT_SIZE, rng, plain_words),
+        "image at end": filler(PROMPT_SIZE, rng, plain_words) + " draw it",
+        "from/to prose": filler(PROMPT_SIZE, rng, plain_words + ["from", "to"]),
+        "'from ' x 20000": "from " * (PROMPT_SIZE // 5),
+    }
+    print(f"\n{'100 KB prompt':>18} {'old ms':>10} {'new ms':>10} {'speedup':>9} {'regex ms':>10}")
+    for name, prompt in prompts.items():
+        old = timed(legacy_detect_action, prompt)
+        new = timed(matcher.detect, prompt)
+        regex = timed(compiled.detect, prompt)
+        print(f"{name:>18} {old * 1000:>10.2f} {new * 1000:>10.2f} {old / new:>8.1f}x {regex * 1000:>10.2f}")
+
+    # A bigger table: one substring scan per keyword vs one pass for all of them
+    keywords = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 10)))
+                for _ in range(200)]
+    table = {"intents": [{"intent": f"INTENT_{i}", "keywords": keywords[i * 20:(i + 1) * 20]}
+                         for i in range(10)]}
+    big = IntentMatcher(table)
+
+    def per_keyword_scans(prompt):
+        norm = prompt.lower()
+        for rule in table["intents"]:
+            if any(k in norm for k in rule["keywords"]):
+                return rule["intent"]
+        return "TEXT"
+
+    prompt = prompts["plain text"]
+    old, new = timed(per_keyword_scans, prompt), timed(big.detect, prompt)
+    print(f"{'200 keywords':>18} {old * 1000:>10.2f} {new * 1000:>10.2f} {old / new:>8.1f}x")
+
+    short = "Please write a short summary of the history of the printing press in Europe"
+    old, new = timed(legacy_detect_action, short, budget=0.5), timed(matcher.detect, short, budget=0.5)
+    print(f"{'short prompt':>18} {old * 1000:>10.4f} {new * 1000:>10.4f} {old / new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    matcher = IntentMatcher.load()
+    compiled = IntentMatcher.load(scan_max_keywords=0)  # the compiled regex, even for the small shipped table
+    ok = check_parity(matcher, "as shipped") & check_parity(compiled, "compiled regex")
+    benchmark(matcher, compiled)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,86 @@
+"""Cold start, warm-up and streaming latency of the router's Ollama client.
+
+Against a running Ollama (OLLAMA_HOST, OLLAMA_MODEL):
+1. cold: the model is unloaded (keep_alive=0), then one request is timed
+2. warmed: unloaded again, warm_up() runs first (as at router startup),
+   then the same request
+3. streaming vs waiting: time to first token against time to the full
+   reply, over REQUESTS prompts on a loaded model
+4. pooled session vs a new connection per request
+
+    python bench_ollama_client.py
+"""
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ollama_client import OllamaClient, OLLAMA_HOST, OLLAMA_MODEL
+
+REQUESTS = int(os.getenv("REQUESTS", "10"))
+PROMPT = [{"role": "user", "content": "Give three short tips for writing clear commit messages."}]
+
+
+def unload():
+    requests.post(f"{OLLAMA_HOST}/api/generate", json={"model": OLLAMA_MODEL, "keep_alive": 0}, timeout=60)
+
+
+def timed_stream(client, messages=PROMPT):
+    start = time.perf_counter()
+    first = None
+    for _ in client.stream_chat(messages):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def fresh_connection_chat(messages):
+    """The same streamed request as the client makes, on a new connection."""
+    start = time.perf_counter()
+    with requests.post(f"{OLLAMA_HOST}/api/chat", stream=True, timeout=120,
+                       json={"model": OLLAMA_MODEL, "messages": messages, "stream": True}) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line and json.loads(line).get("done"):
+                break
+    return time.perf_counter() - start
+
+
+def main():
+    client = OllamaClient()
+    rows = []
+
+    unload()
+    first, total = timed_stream(client)
+    rows.append(("cold request", first, total))
+
+    unload()
+    start = time.perf_counter()
+    if not client.warm_up():
+        print(f"warm-up failed: {client.warm_up_error}")
+        return
+    warm_up = time.perf_counter() - start
+    first, total = timed_stream(client)
+    rows.append((f"after warm_up() ({warm_up:.2f}s at startup)", first, total))
+
+    runs = [timed_stream(client) for _ in range(REQUESTS)]
+    rows.append(("streamed, loaded model (mean)", sum(r[0] for r in runs) / REQUESTS,
+                 sum(r[1] for r in runs) / REQUESTS))
+
+    short = [{"role": "user", "content": "Reply with one word."}]
+    pooled = sum(timed_stream(client, short)[1] for _ in range(REQUESTS)) / REQUESTS
+    fresh = sum(fresh_connection_chat(short) for _ in range(REQUESTS)) / REQUESTS
+
+    print(f"{'request':<44}{'first token s':>14}{'full reply s':>14}")
+    for name, first, total in rows:
+        print(f"{name:<44}{first or 0:>14.3f}{total:>14.3f}")
+    print(f"short reply, pooled session:        {pooled:.3f}s")
+    print(f"short reply, new connection each:   {fresh:.3f}s")
+    print(client.report())
+
+
+if __name__ == "__main__":
+    main()
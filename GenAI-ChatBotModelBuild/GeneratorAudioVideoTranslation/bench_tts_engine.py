@@ -0,0 +1,90 @@
+"""Syntheses per second and cache hit rate for the offline TTS pool.
+
+1. cold: a new pyttsx3 engine per request, as in 5.Text2Audio/TextToAudio.py
+2. pool: TTSEngine with 1 and with TTS_WORKERS warm worker processes, all
+   texts unique (every request synthesizes)
+3. repeats: a skewed workload where popular phrases come back, showing
+   the cache hit rate and the request rate it allows
+
+Needs pyttsx3 and a speech driver (eSpeak / eSpeak NG on Linux).
+
+    python bench_tts_engine.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from tts_engine import TTSEngine, TTS_WORKERS
+
+REQUESTS = 60
+REPEAT_REQUESTS = 300
+PHRASES = 40
+CLIENTS = 8
+
+
+def sentence(i):
+    return f"Your order number {i} has shipped and will arrive on day {i % 7 + 1} of next week."
+
+
+def cold(n):
+    import pyttsx3
+    tmp = tempfile.mkdtemp()
+    start = time.perf_counter()
+    for i in range(n):
+        engine = pyttsx3.init()
+        engine.setProperty("rate", 150)
+        engine.save_to_file(sentence(i), os.path.join(tmp, f"{i}.wav"))
+        engine.runAndWait()
+        engine.stop()
+    elapsed = time.perf_counter() - start
+    shutil.rmtree(tmp)
+    return n / elapsed
+
+
+def run(workers, texts):
+    cache_dir = tempfile.mkdtemp()
+    engine = TTSEngine(workers=workers, cache_dir=cache_dir)
+    engine.warm_up()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(CLIENTS) as pool:
+        list(pool.map(engine.synthesize, texts))
+    elapsed = time.perf_counter() - start
+    report = engine.report()
+    engine.close()
+    shutil.rmtree(cache_dir)
+    return len(texts) / elapsed, report
+
+
+def main():
+    rows = []
+    try:
+        rows.append(("cold engine per request", f"{cold(REQUESTS // 3):.1f}", "-", "-"))
+    except Exception as e:
+        print(f"pyttsx3 is not usable here: {e}")
+        return
+
+    unique = [sentence(i) for i in range(REQUESTS)]
+    for workers in sorted({1, TTS_WORKERS}):
+        rate, report = run(workers, unique)
+        rows.append((f"pool, {workers} worker(s), unique", f"{rate:.1f}",
+                     f"{report['syntheses']}", f"{report['hit_rate']:.0%}"))
+
+    random.seed(1)
+    weights = [1 / (rank + 1) for rank in range(PHRASES)]  # Zipf-like popularity
+    skewed = random.choices([sentence(i) for i in range(PHRASES)], weights, k=REPEAT_REQUESTS)
+    rate, report = run(TTS_WORKERS, skewed)
+    rows.append((f"pool, {TTS_WORKERS} worker(s), repeats", f"{rate:.1f}",
+                 f"{report['syntheses']}", f"{report['hit_rate']:.0%}"))
+
+    print(f"{'mode':<34}{'requests/s':>12}{'syntheses':>11}{'hit rate':>10}")
+    for row in rows:
+        print(f"{row[0]:<34}{row[1]:>12}{row[2]:>11}{row[3]:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Check router_app's per-generator pools: saturation, timeouts, metrics.
+
+The IMAGE pool is shrunk to one worker, one queue slot and a 1 s timeout,
+and generate_image is replaced with a call that hangs for 3 s. Four
+simultaneous image requests must then give:
+- one 504, the running job
+- one 504, the queued job, which is cancelled before it starts
+- two immediate 503s with Retry-After
+Meanwhile a TEXT request must still be answered, and /metrics must show
+the rejections.
+
+Streams go through the same admission: the TRANSLATION pool gets one
+worker, no queue and a 1 s timeout, and its model stream is replaced by
+one that takes 2 s. Of two simultaneous /generate/stream translations
+one must get an immediate 503, the other an error event once the timeout
+passes, and both must show in the TRANSLATION pool's counters. No network
+access is needed: the image and audio backends are set to the remote ones
+(never called here) and the warm-up, which create_app starts, is skipped.
+
+    python check_generator_pools.py
+"""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+# Offline backends: no Stable Diffusion download, no pyttsx3 worker processes
+os.environ["ROUTER_IMAGE"] = "remote"
+os.environ["ROUTER_TTS"] = "gtts"
+os.environ["ROUTER_POOLS"] = ('{"IMAGE": {"workers": 1, "queue": 1, "timeout": 1},'
+                              ' "TRANSLATION": {"workers": 1, "queue": 0, "timeout": 1}}')
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import router_app
+
+HANG_SECONDS = 3
+
+
+def hanging_image(prompt):
+    time.sleep(HANG_SECONDS)
+    return "too late"
+
+
+def post(prompt):
+    start = time.perf_counter()
+    with router_app.app.test_client() as client:
+        r = client.post("/generate", json={"prompt": prompt})
+    return r.status_code, r.headers.get("Retry-After"), time.perf_counter() - start
+
+
+def slow_stream(prompt):
+    for word in "one two three four five".split():
+        time.sleep(0.4)
+        yield word + " "
+
+
+def post_stream(prompt):
+    start = time.perf_counter()
+    with router_app.app.test_client() as client:
+        r = client.post("/generate/stream", json={"prompt": prompt})
+        body = r.get_data(as_text=True)
+    return r.status_code, r.headers.get("Retry-After"), body, time.perf_counter() - start
+
+
+def check_streams(failures):
+    router_app.stream_text = slow_stream
+    with ThreadPoolExecutor(2) as pool:
+        first = pool.submit(post_stream, "translate good morning into French")
+        time.sleep(0.2)
+        second = pool.submit(post_stream, "translate good night into French").result()
+        first = first.result()
+    print(f"stream 1 -> {first[0]} after {first[3]:.2f}s, error event: {'event: error' in first[2]}")
+    print(f"stream 2 -> {second[0]} Retry-After={second[1]} after {second[3]:.2f}s")
+    if first[0] != 200 or "event: error" not in first[2] or "within 1s" not in first[2]:
+        failures.append("a stream running past the pool timeout must end with an error event")
+    if second[0] != 503 or not second[1] or second[3] > 0.5:
+        failures.append("a stream beyond the pool's slots must get an immediate 503 with Retry-After")
+    report = router_app.pools["TRANSLATION"].report()
+    print({k: report[k] for k in ("submitted", "rejected", "timed_out", "running", "queued")})
+    if (report["submitted"], report["rejected"], report["timed_out"], report["running"], report["queued"]) \
+            != (1, 1, 1, 0, 0):
+        failures.append("expected TRANSLATION submitted=1, rejected=1, timed_out=1 and nothing left running")
+
+
+def main():
+    router_app.init_models()
+    router_app.generate_image = hanging_image
+    router_app.generate_text = lambda prompt: "fine"
+    failures = []
+
+    with ThreadPoolExecutor(5) as pool:
+        images = [pool.submit(post, f"draw picture {i}") for i in range(4)]
+        time.sleep(0.2)
+        text = pool.submit(post, "hello there").result()
+        results = sorted(f.result() for f in images)
+
+    for status, retry_after, elapsed in results:
+        print(f"IMAGE -> {status} Retry-After={retry_after} after {elapsed:.2f}s")
+    print(f"TEXT  -> {text[0]} after {text[2]:.2f}s")
+
+    statuses = [status for status, _, _ in results]
+    if statuses != [503, 503, 504, 504]:
+        failures.append(f"expected two 503s and two 504s, got {statuses}")
+    if any(status == 503 and (not retry_after or elapsed > 0.5) for status, retry_after, elapsed in results):
+        failures.append("503s must come at once with a Retry-After header")
+    if text[0] != 200 or text[2] > 0.5:
+        failures.append("TEXT requests must not wait for the IMAGE pool")
+
+    report = router_app.pools["IMAGE"].report()
+    print({k: report[k] for k in ("submitted", "rejected", "timed_out", "cancelled", "running", "queued")})
+    if (report["rejected"], report["timed_out"], report["cancelled"]) != (2, 2, 1):
+        failures.append("expected rejected=2, timed_out=2, cancelled=1")
+
+    time.sleep(HANG_SECONDS)  # the abandoned job finishes and frees its worker
+    with router_app.app.test_client() as client:
+        metrics = client.get("/metrics").get_data(as_text=True)
+    if 'router_generator_rejected_total{generator="IMAGE"} 2' not in metrics:
+        failures.append("/metrics does not show the rejections")
+    if router_app.pools["IMAGE"].report()["running"] != 0:
+        failures.append("the timed-out job never released its worker")
+
+    check_streams(failures)
+
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Fire 20 audio requests at router_app in parallel and check the outputs.
+
+Every response must carry its own /files/ URL, every file must download
+intact (its bytes hash to the name in the URL, and are a WAV file or
+exactly what was synthesized for that prompt), and the file route must
+answer If-None-Match with 304 and a Range request with 206.
+
+With the default ROUTER_TTS=local this runs the real offline pyttsx3
+pool. With ROUTER_TTS=gtts, gTTS is replaced with an offline synthesizer
+that writes prompt-specific bytes slowly, so the 20 saves really
+overlap; add --real to call Google TTS instead (needs internet).
+
+    python check_parallel_audio.py
+    ROUTER_TTS=gtts python check_parallel_audio.py [--real]
+"""
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import sys
+import threading
+import time
+
+import requests
+from werkzeug.serving import make_server
+
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+os.environ.setdefault("ROUTER_IMAGE", "remote")  # no Stable Diffusion worker for an audio check
+os.environ.setdefault("ROUTER_POOLS", '{"AUDIO": {"workers": 8, "queue": 12}}')  # room for all 20
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import router_app
+
+PARALLEL = 20
+PORT = 5499
+
+
+def fake_audio(text):
+    return b"ID3" + hashlib.sha256(text.encode()).digest() * 4096  # ~128 KB per prompt
+
+
+class SlowFakeTTS:
+    def __init__(self, text, timeout=None):
+        self.text = text
+
+    def save(self, path):
+        data = fake_audio(self.text)
+        with open(path, "wb") as f:
+            for i in range(0, len(data), 16384):
+                f.write(data[i:i + 16384])
+                time.sleep(0.005)  # keep the writes of all requests interleaved
+
+
+def request_audio(i):
+    prompt = f"Convert to audio: parallel message number {i}"
+    r = requests.post(f"http://127.0.0.1:{PORT}/generate", json={"prompt": prompt}, timeout=60)
+    r.raise_for_status()
+    body = r.json()
+    assert body["action"] == "AUDIO", body
+    return body["augmented_prompt"], body["result"]
+
+
+def main():
+    router_app.init_models()
+    fake = router_app.local_tts is None and "--real" not in sys.argv
+    if fake:
+        router_app.gTTS = SlowFakeTTS
+
+    server = make_server("127.0.0.1", PORT, router_app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    failures = []
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(PARALLEL) as pool:
+            results = list(pool.map(request_audio, range(PARALLEL)))
+        elapsed = time.perf_counter() - start
+
+        urls = [url for _, url in results]
+        if len(set(urls)) != PARALLEL:
+            failures.append(f"expected {PARALLEL} distinct URLs, got {len(set(urls))}")
+
+        for text, url in results:
+            r = requests.get(url, timeout=30)
+            name = url.rsplit("/", 1)[-1]
+            if r.status_code != 200 or hashlib.sha256(r.content).hexdigest()[:32] != name.split(".")[0]:
+                failures.append(f"{url}: status {r.status_code}, content does not match its name")
+            elif fake and r.content != fake_audio(text):
+                failures.append(f"{url}: holds another request's audio")
+            elif router_app.local_tts is not None and not (r.content[:4] == b"RIFF" and r.content[8:12] == b"WAVE"):
+                failures.append(f"{url}: not a WAV file")
+
+        url = urls[0]
+        full = requests.get(url, timeout=30)
+        cached = requests.get(url, headers={"If-None-Match": full.headers["ETag"]}, timeout=30)
+        if cached.status_code != 304:
+            failures.append(f"If-None-Match: expected 304, got {cached.status_code}")
+        part = requests.get(url, headers={"Range": "bytes=100-199"}, timeout=30)
+        if part.status_code != 206 or part.content != full.content[100:200]:
+            failures.append(f"Range: expected 206 with bytes 100-199, got {part.status_code}")
+
+        print(f"{PARALLEL} parallel audio requests in {elapsed:.2f}s, {len(set(urls))} distinct files")
+        print(f"ETag {full.headers['ETag']}, Cache-Control: {full.headers['Cache-Control']}")
+    finally:
+        server.shutdown()
+
+    for failure in failures:
+        print("FAIL", failure)
+    print("OK" if not failures else f"{len(failures)} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Bounded thread pools for router_app's blocking generators.
+
+Each generator type (TEXT, TRANSLATION, AUDIO, IMAGE) gets its own pool:
+a fixed number of worker threads plus a short wait queue. A call that
+finds both full is rejected at once with PoolSaturated instead of tying
+up the request thread; the route turns that into 503 + Retry-After.
+
+A caller waits at most the pool's timeout. If the job hasn't started by
+then it is cancelled. If it is already running, Python can't stop the
+thread, so the generators pass the same timeout to their network calls
+and the thread frees itself shortly after. Its slot is only given back
+when the job really ends, so the pool never hands out more threads than
+it has.
+
+Streamed generations (TEXT/TRANSLATION over SSE) run on the request
+thread instead, but go through the same admission with stream(): they
+take a slot, count as queued until their first chunk and as running
+after, and are cut off once they have run for longer than the timeout.
+
+Limits can be overridden with
+ROUTER_POOLS='{"IMAGE": {"workers": 1, "queue": 2, "timeout": 90}}'.
+"""
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import json
+import math
+import os
+import threading
+import time
+
+DEFAULT_POOLS = {
+    "TEXT": {"workers": 4, "queue": 8, "timeout": 60},
+    "TRANSLATION": {"workers": 4, "queue": 8, "timeout": 60},
+    "AUDIO": {"workers": 4, "queue": 8, "timeout": 30},
+    "IMAGE": {"workers": 2, "queue": 4, "timeout": 120},
+}
+POOLS = {name: {**config, **json.loads(os.getenv("ROUTER_POOLS", "{}")).get(name, {})}
+         for name, config in DEFAULT_POOLS.items()}
+
+DURATION_ALPHA = 0.2
+
+
+class PoolSaturated(Exception):
+    def __init__(self, name, retry_after):
+        super().__init__(f"The {name} generator is busy, retry later")
+        self.retry_after = retry_after
+
+
+class GeneratorTimeout(Exception):
+    def __init__(self, name, timeout):
+        super().__init__(f"The {name} generator did not finish within {timeout}s")
+
+
+class GeneratorPool:
+    def __init__(self, name, workers, queue, timeout):
+        self.name = name
+        self.workers = workers
+        self.queue = queue
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"gen-{name.lower()}")
+        self.slots = threading.BoundedSemaphore(workers + queue)
+        self.lock = threading.Lock()
+        self.running = 0
+        self.queued = 0
+        self.avg_duration = None
+        self.stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+                      "timed_out": 0, "cancelled": 0, "abandoned": 0}
+
+    def _admit(self):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise PoolSaturated(self.name, self.retry_after())
+        with self.lock:
+            self.queued += 1
+            self.stats["submitted"] += 1
+
+    def run(self, func, *args):
+        """Run func(*args) on the pool and return its result, or raise PoolSaturated/GeneratorTimeout."""
+        self._admit()
+        future = self.executor.submit(self._job, func, args)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self.lock:
+                self.stats["timed_out"] += 1
+            if future.cancel():  # never started: give the slot back now
+                with self.lock:
+                    self.queued -= 1
+                    self.stats["cancelled"] += 1
+                self.slots.release()
+            raise GeneratorTimeout(self.name, self.timeout) from None
+
+    def _job(self, func, args):
+        with self.lock:
+            self.queued -= 1
+            self.running += 1
+        start = time.monotonic()
+        ok = False
+        try:
+            result = func(*args)
+            ok = True
+            return result
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.stats["completed" if ok else "failed"] += 1
+                self._record_duration(time.monotonic() - start)
+            self.slots.release()
+
+    def stream(self, func, *args):
+        """Yield the chunks of the generator func(*args) on the caller's thread, admitted like run().
+
+        Admission happens on the first next(), which raises PoolSaturated when
+        the pool is full; GeneratorTimeout is raised once the stream has run
+        longer than the timeout. Closing the stream closes func's generator.
+        """
+        self._admit()
+        start = time.monotonic()
+        started = False
+        outcome = "failed"
+        chunks = func(*args)
+        try:
+            for chunk in chunks:
+                if not started:
+                    started = True
+                    with self.lock:
+                        self.queued -= 1
+                        self.running += 1
+                if time.monotonic() - start > self.timeout:
+                    outcome = "timed_out"
+                    raise GeneratorTimeout(self.name, self.timeout)
+                yield chunk
+            outcome = "completed"
+        except GeneratorExit:
+            outcome = "abandoned"  # the client went away
+            raise
+        finally:
+            chunks.close()
+            with self.lock:
+                if started:
+                    self.running -= 1
+                else:
+                    self.queued -= 1
+                self.stats[outcome] += 1
+                if outcome == "completed":
+                    self._record_duration(time.monotonic() - start)
+            self.slots.release()
+
+    def _record_duration(self, duration):
+        # Called with the lock held
+        if self.avg_duration is None:
+            self.avg_duration = duration
+        self.avg_duration += DURATION_ALPHA * (duration - self.avg_duration)
+
+    def retry_after(self):
+        # Time for the jobs ahead of a new caller to drain through the workers
+        per_job = self.avg_duration or 1.0
+        return max(1, math.ceil(per_job * (self.queued + self.running) / self.workers))
+
+    def report(self):
+        with self.lock:
+            return {
+                **self.stats,
+                "workers": self.workers,
+                "queue_size": self.queue,
+                "timeout": self.timeout,
+                "running": self.running,
+                "queued": self.queued,
+                "saturation": (self.running + self.queued) / (self.workers + self.queue),
+                "avg_duration_s": round(self.avg_duration, 3) if self.avg_duration is not None else None,
+            }
+
+
+def create_pools(config=POOLS):
+    return {name: GeneratorPool(name, **limits) for name, limits in config.items()}
+
+
+METRICS = [
+    # (metric, report key, kind, help)
+    ("router_generator_running", "running", "gauge", "Generator jobs currently running"),
+    ("router_generator_queue_depth", "queued", "gauge", "Generator jobs waiting for a worker"),
+    ("router_generator_saturation", "saturation", "gauge", "Share of worker + queue slots in use"),
+    ("router_generator_workers", "workers", "gauge", "Worker threads per generator"),
+    ("router_generator_submitted_total", "submitted", "counter", "Jobs accepted"),
+    ("router_generator_completed_total", "completed", "counter", "Jobs that returned a result"),
+    ("router_generator_failed_total", "failed", "counter", "Jobs that raised"),
+    ("router_generator_rejected_total", "rejected", "counter", "Calls turned away with 503"),
+    ("router_generator_timed_out_total", "timed_out", "counter", "Calls that gave up waiting"),
+    ("router_generator_cancelled_total", "cancelled", "counter", "Timed-out jobs cancelled before they started"),
+    ("router_generator_abandoned_total", "abandoned", "counter", "Streams closed early by the client"),
+]
+
+
+def render_metrics(pools):
+    """Prometheus text format for every pool."""
+    reports = {name: pool.report() for name, pool in pools.items()}
+    lines = []
+    for metric, key, kind, help in METRICS:
+        lines.append(f"# HELP {metric} {help}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, report in reports.items():
+            lines.append(f'{metric}{{generator="{name}"}} {report[key]}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,185 @@
+"""Resident local Stable Diffusion for router_app IMAGE actions.
+
+The pipeline from 3.GenAI-Images/1.2.BuildText2Image_Diffusers_02.py is
+loaded once, on a background thread, and one worker thread serves a
+request queue; torch already spreads a single image over all cores, so
+running two at once would only make both slower.
+
+CPU settings (all overridable):
+- DPM-Solver++ in place of the default PNDM scheduler, so about 12
+  steps give what used to take 20 or more (SD_SCHEDULER, SD_STEPS)
+- attention slicing, which keeps peak memory down at 512x512
+- channels-last tensors for the UNet and VAE convolutions
+- intra-op threads set to the core count and one inter-op thread
+  (SD_THREADS, SD_INTEROP_THREADS)
+
+A caller that gives up cancels its job. If the job is still queued it
+is skipped; if it is running it stops at the next denoising step.
+"""
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+import io
+import os
+import queue
+import threading
+import time
+
+SD_MODEL = os.getenv("SD_MODEL", "stabilityai/stable-diffusion-2-1-base")
+SD_SCHEDULER = os.getenv("SD_SCHEDULER", "dpm")  # "dpm" or "default"
+SD_STEPS = int(os.getenv("SD_STEPS", "12"))
+SD_GUIDANCE = float(os.getenv("SD_GUIDANCE", "7.5"))
+SD_SIZE = int(os.getenv("SD_SIZE", "512"))
+SD_ATTENTION_SLICING = os.getenv("SD_ATTENTION_SLICING", "1") == "1"
+SD_CHANNELS_LAST = os.getenv("SD_CHANNELS_LAST", "1") == "1"
+SD_THREADS = int(os.getenv("SD_THREADS", str(os.cpu_count() or 1)))
+SD_INTEROP_THREADS = int(os.getenv("SD_INTEROP_THREADS", "1"))
+SD_QUEUE_SIZE = int(os.getenv("SD_QUEUE_SIZE", "8"))
+
+
+class ImageQueueFull(Exception):
+    pass
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+class DiffusionWorker:
+    def __init__(self, model=SD_MODEL, scheduler=SD_SCHEDULER, steps=SD_STEPS, guidance=SD_GUIDANCE,
+                 size=SD_SIZE, attention_slicing=SD_ATTENTION_SLICING, channels_last=SD_CHANNELS_LAST,
+                 threads=SD_THREADS, interop_threads=SD_INTEROP_THREADS, queue_size=SD_QUEUE_SIZE):
+        self.model = model
+        self.scheduler = scheduler
+        self.steps = steps
+        self.guidance = guidance
+        self.size = size
+        self.attention_slicing = attention_slicing
+        self.channels_last = channels_last
+        self.threads = threads
+        self.interop_threads = interop_threads
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.pipe = None
+        self.ready = threading.Event()
+        self.load_error = None
+        self.stats = {"images": 0, "failed": 0, "cancelled": 0, "rejected": 0,
+                      "load_seconds": None, "generate_seconds": 0.0}
+        self.thread = None
+
+    def start(self):
+        """Load the pipeline and start serving, without blocking the caller."""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="diffusion-worker", daemon=True)
+            self.thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        self.ready.wait(timeout)
+        if self.load_error is not None:
+            raise RuntimeError(f"Stable Diffusion pipeline failed to load: {self.load_error}")
+        return self.ready.is_set()
+
+    def _load(self):
+        import torch
+        from diffusers import AutoPipelineForText2Image, DPMSolverMultistepScheduler
+
+        # Thread counts have to be set before torch runs anything in parallel
+        torch.set_num_threads(self.threads)
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError:
+            pass  # already fixed by earlier torch work in this process
+        start = time.perf_counter()
+        pipe = AutoPipelineForText2Image.from_pretrained(self.model, torch_dtype=torch.float32).to("cpu")
+        if self.scheduler == "dpm":
+            pipe.scheduler = DPMSolverMultistepScheduler.from_config(pipe.scheduler.config)
+        if self.attention_slicing:
+            pipe.enable_attention_slicing()
+        if self.channels_last:
+            pipe.unet.to(memory_format=torch.channels_last)
+            pipe.vae.to(memory_format=torch.channels_last)
+        pipe.set_progress_bar_config(disable=True)
+        self.pipe = pipe
+        # One short run so the first real request doesn't pay for lazy initialisation
+        self._generate("warm up", steps=1)
+        self.stats["load_seconds"] = round(time.perf_counter() - start, 2)
+
+    def _run(self):
+        try:
+            self._load()
+        except Exception as e:
+            self.load_error = e
+            self.ready.set()
+            self._fail_queued(e)
+            return
+        self.ready.set()
+        while True:
+            prompt, future, cancelled = self.jobs.get()
+            if not future.set_running_or_notify_cancel():
+                self.stats["cancelled"] += 1
+                continue
+            start = time.perf_counter()
+            try:
+                png = self._generate(prompt, cancelled=cancelled)
+            except GenerationCancelled as e:
+                self.stats["cancelled"] += 1
+                future.set_exception(e)
+            except Exception as e:
+                self.stats["failed"] += 1
+                future.set_exception(e)
+            else:
+                self.stats["images"] += 1
+                self.stats["generate_seconds"] += time.perf_counter() - start
+                future.set_result(png)
+
+    def _fail_queued(self, error):
+        while True:
+            try:
+                _, future, _ = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
+
+    def _generate(self, prompt, steps=None, cancelled=None):
+        import torch
+
+        def check_cancelled(pipe, step, timestep, callback_kwargs):
+            if cancelled is not None and cancelled.is_set():
+                raise GenerationCancelled("image request was cancelled")
+            return callback_kwargs
+
+        with torch.inference_mode():
+            image = self.pipe(prompt, num_inference_steps=steps or self.steps, guidance_scale=self.guidance,
+                              height=self.size, width=self.size, callback_on_step_end=check_cancelled).images[0]
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG")
+        return buffer.getvalue()
+
+    def generate(self, prompt, timeout=None):
+        """PNG bytes for `prompt`; raises ImageQueueFull, TimeoutError or the generation error."""
+        if self.load_error is not None:
+            raise RuntimeError(f"Stable Diffusion pipeline failed to load: {self.load_error}")
+        future, cancelled = Future(), threading.Event()
+        try:
+            self.jobs.put_nowait((prompt, future, cancelled))
+        except queue.Full:
+            self.stats["rejected"] += 1
+            raise ImageQueueFull("the image queue is full") from None
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if not future.cancel():
+                cancelled.set()  # already running: stop at the next step
+            raise TimeoutError(f"image generation did not finish within {timeout}s") from None
+
+    def report(self):
+        images = self.stats["images"]
+        return {
+            **self.stats,
+            "model": self.model,
+            "ready": self.ready.is_set() and self.load_error is None,
+            "queued": self.jobs.qsize(),
+            "scheduler": self.scheduler,
+            "steps": self.steps,
+            "threads": self.threads,
+            "seconds_per_image": round(self.stats["generate_seconds"] / images, 2) if images else None,
+        }
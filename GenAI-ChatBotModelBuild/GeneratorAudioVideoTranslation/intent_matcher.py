@@ -0,0 +1,145 @@
+"""Keyword intent matching for router_app.detect_action.
+
+The keyword table (intent_keywords.json, or ROUTER_KEYWORDS_PATH) lists
+intents in priority order. With "whole_words" off (the default) matching
+is plain substring matching, i.e. exactly the old `any(k in norm ...)`
+checks; with it on, keywords only match as whole words.
+
+Small tables (up to SCAN_MAX_KEYWORDS keywords, like the shipped one)
+keep those checks: a C-level substring scan per keyword is faster on a
+typical prompt than one pass of a regex. Bigger tables, and whole-word
+matching, compile all keywords into one regex shaped like a trie, so the
+prompt is scanned once however many keywords there are, and the scan
+stops as soon as the top-priority intent is seen. After a hit the scan
+resumes one character later rather than after the keyword, so
+overlapping keywords are found too.
+
+The real fix for the shipped table is the from/to rule: the old
+`re.search(r"from .* to .*", norm)` backtracks quadratically on long
+prompts full of "from "; has_from_to() answers the same question in one
+linear pass.
+"""
+from pathlib import Path
+import json
+import os
+import re
+
+KEYWORDS_PATH = Path(os.getenv("ROUTER_KEYWORDS_PATH", Path(__file__).with_name("intent_keywords.json")))
+# Up to this many keywords, one substring scan each beats the compiled regex (bench_intent_matcher.py)
+SCAN_MAX_KEYWORDS = 50
+
+
+def has_from_to(text):
+    """Same result as re.search(r"from .* to .*", text), in linear time.
+
+    `.` doesn't match newlines, so some line must have a "from " followed
+    later on the same line by " to ". The first "from " on a line leaves
+    the most room, so only that one needs checking.
+    """
+    start = text.find("from ")
+    while start != -1:
+        line_end = text.find("\n", start)
+        if line_end == -1:
+            line_end = len(text)
+        if text.find(" to ", start + 5, line_end) != -1:
+            return True
+        start = text.find("from ", line_end)
+    return False
+
+
+def trie_pattern(words):
+    """Regex alternation factored by common prefixes ("translat(?:e|ion)")."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}  # end of a word
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        if "" in node:  # a shorter word ends here; greedy, so the longest word wins
+            return "(?:" + "|".join(branches) + ")?"
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class IntentMatcher:
+    def __init__(self, table, scan_max_keywords=SCAN_MAX_KEYWORDS):
+        self.default = table.get("default", "TEXT")
+        self.whole_words = table.get("whole_words", False)
+        self.intents = [rule["intent"] for rule in table["intents"]]
+        self.from_to = {i for i, rule in enumerate(table["intents"]) if rule.get("from_to")}
+
+        # keyword -> priority (index in the table); the first listing wins
+        self.priority = {}
+        for i, rule in enumerate(table["intents"]):
+            for keyword in rule["keywords"]:
+                self.priority.setdefault(keyword.lower(), i)
+
+        # At one position the regex reports only the longest keyword; every shorter
+        # keyword found there is a prefix of it, so fold their priorities in up front.
+        self.prefixes = {
+            keyword: sorted((p, len(k)) for k, p in self.priority.items() if keyword.startswith(k))
+            for keyword in self.priority
+        }
+
+        # Small substring tables: the rules' keywords, scanned for one by one in priority order
+        self.scan_rules = None
+        if not self.whole_words and len(self.priority) <= scan_max_keywords:
+            self.scan_rules = [[keyword.lower() for keyword in rule["keywords"]] for rule in table["intents"]]
+
+        pattern = trie_pattern(self.priority)
+        if self.whole_words:
+            pattern = rf"\b{pattern}"
+        self.regex = re.compile(pattern)
+        self.word_char = re.compile(r"\w")
+
+    @classmethod
+    def load(cls, path=KEYWORDS_PATH, scan_max_keywords=SCAN_MAX_KEYWORDS):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), scan_max_keywords)
+
+    def best_keyword(self, norm):
+        """Highest priority (lowest index) of any keyword in `norm`, or None."""
+        best = None
+        search = self.regex.search
+        match = search(norm)
+        while match is not None:
+            start = match.start()
+            for priority, length in self.prefixes[match.group()]:
+                if best is not None and priority >= best:
+                    break
+                if self.whole_words and self.word_char.match(norm, start + length):
+                    continue  # this keyword ends mid-word here
+                best = priority
+                break
+            if best == 0:
+                break
+            match = search(norm, start + 1)
+        return best
+
+    def scan(self, norm):
+        """Index of the first rule with a keyword (or a from/to) in `norm`, or None."""
+        for i, keywords in enumerate(self.scan_rules):
+            if any(k in norm for k in keywords) or (i in self.from_to and has_from_to(norm)):
+                return i
+        return None
+
+    def detect(self, prompt):
+        norm = prompt.lower()
+        if self.scan_rules is not None:
+            best = self.scan(norm)
+            return self.intents[best] if best is not None else self.default
+        best = self.best_keyword(norm)
+        # Rules without a keyword hit above the from/to tier still get the from/to check
+        for i in sorted(self.from_to):
+            if best is not None and best <= i:
+                break
+            if has_from_to(norm):
+                best = i
+                break
+        return self.intents[best] if best is not None else self.default
@@ -0,0 +1,147 @@
+"""Streaming Ollama client for router_app's TEXT and TRANSLATION actions.
+
+Talks to Ollama's HTTP API directly over one pooled requests.Session:
+- /api/chat with stream=true yields the reply token by token
+- every request carries keep_alive (OLLAMA_KEEP_ALIVE), so the model
+  stays loaded between requests instead of being evicted after 5 idle
+  minutes
+- at most OLLAMA_MAX_CONCURRENCY generations run per model; a caller
+  that can't get a slot within OLLAMA_QUEUE_TIMEOUT gets ModelBusy
+- warm_up() loads the model (an empty prompt loads without generating)
+  so the first user request doesn't pay the load time
+"""
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434").rstrip("/")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3")
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")  # "-1" keeps it loaded for good
+OLLAMA_MAX_CONCURRENCY = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "2"))
+OLLAMA_QUEUE_TIMEOUT = float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "10"))
+OLLAMA_NUM_PREDICT = int(os.getenv("OLLAMA_NUM_PREDICT", "300"))
+OLLAMA_CONNECT_TIMEOUT = 5
+
+
+class ModelBusy(Exception):
+    def __init__(self, model, retry_after):
+        super().__init__(f"Model '{model}' is busy, retry later")
+        self.retry_after = retry_after
+
+
+class OllamaClient:
+    def __init__(self, host=OLLAMA_HOST, model=OLLAMA_MODEL, keep_alive=OLLAMA_KEEP_ALIVE,
+                 max_concurrency=OLLAMA_MAX_CONCURRENCY, queue_timeout=OLLAMA_QUEUE_TIMEOUT,
+                 num_predict=OLLAMA_NUM_PREDICT, read_timeout=60):
+        self.host = host
+        self.model = model
+        # A duration ("30m") or a number of seconds (-1 = never unload)
+        self.keep_alive = int(keep_alive) if str(keep_alive).lstrip("-").isdigit() else keep_alive
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.num_predict = num_predict
+        self.read_timeout = read_timeout  # longest silence between two streamed lines
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(4, max_concurrency * 2))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.slots = {}  # model -> BoundedSemaphore
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.warm_up_error = None
+        self.stats = {"generations": 0, "rejected": 0, "in_flight": 0, "prompt_tokens": 0,
+                      "completion_tokens": 0, "load_seconds": 0.0, "first_token_seconds": 0.0}
+
+    def _slot(self, model):
+        with self.lock:
+            slot = self.slots.get(model)
+            if slot is None:
+                slot = self.slots[model] = threading.BoundedSemaphore(self.max_concurrency)
+            return slot
+
+    def warm_up(self, model=None):
+        """Load the model into memory and mark the client ready; False (see warm_up_error) on failure."""
+        try:
+            response = self.session.post(f"{self.host}/api/generate",
+                                         json={"model": model or self.model, "prompt": "",
+                                               "keep_alive": self.keep_alive},
+                                         timeout=(OLLAMA_CONNECT_TIMEOUT, 600))
+            response.raise_for_status()
+        except requests.RequestException as e:
+            self.warm_up_error = str(e)
+            return False
+        self.warm_up_error = None
+        self.ready.set()
+        return True
+
+    def stream_chat(self, messages, model=None):
+        """Yield the reply's text chunks as Ollama produces them.
+
+        The model's slot is held until the generator is exhausted or closed
+        (Flask closes it when the client disconnects), which also closes the
+        upstream response so Ollama stops generating.
+        """
+        model = model or self.model
+        slot = self._slot(model)
+        if not slot.acquire(timeout=self.queue_timeout):
+            with self.lock:
+                self.stats["rejected"] += 1
+            raise ModelBusy(model, max(1, round(self.queue_timeout)))
+        with self.lock:
+            self.stats["in_flight"] += 1
+        start = time.perf_counter()
+        first_token = None
+        try:
+            with self.session.post(f"{self.host}/api/chat", stream=True,
+                                   json={"model": model, "messages": messages, "stream": True,
+                                         "keep_alive": self.keep_alive,
+                                         "options": {"num_predict": self.num_predict}},
+                                   timeout=(OLLAMA_CONNECT_TIMEOUT, self.read_timeout)) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if "error" in chunk:
+                        raise RuntimeError(f"Ollama error: {chunk['error']}")
+                    text = chunk.get("message", {}).get("content", "")
+                    if text:
+                        if first_token is None:
+                            first_token = time.perf_counter() - start
+                        yield text
+                    if chunk.get("done"):
+                        # No break: reading to the end of the body lets the connection go back to the pool
+                        self._record(chunk, first_token)
+        finally:
+            with self.lock:
+                self.stats["in_flight"] -= 1
+            slot.release()
+
+    def chat(self, messages, model=None):
+        return "".join(self.stream_chat(messages, model))
+
+    def _record(self, final, first_token):
+        with self.lock:
+            self.stats["generations"] += 1
+            self.stats["prompt_tokens"] += final.get("prompt_eval_count", 0)
+            self.stats["completion_tokens"] += final.get("eval_count", 0)
+            self.stats["load_seconds"] += final.get("load_duration", 0) / 1e9  # Ollama reports nanoseconds
+            self.stats["first_token_seconds"] += first_token or 0.0
+
+    def report(self):
+        with self.lock:
+            stats = dict(self.stats)
+        generations = stats["generations"]
+        return {
+            **stats,
+            "model": self.model,
+            "keep_alive": self.keep_alive,
+            "max_concurrency": self.max_concurrency,
+            "ready": self.ready.is_set(),
+            "warm_up_error": self.warm_up_error,
+            "avg_first_token_seconds": stats["first_token_seconds"] / generations if generations else None,
+        }
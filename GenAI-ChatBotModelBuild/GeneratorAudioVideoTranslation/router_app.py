@@ -1,17 +1,56 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, url_for, abort
+from flask import copy_current_request_context, stream_with_context
 from flask_cors import CORS
-from langchain_ollama import ChatOllama
 from openai import OpenAI
-import re, os
+import hashlib, json, os, re, shutil, threading, time, uuid
 import requests
 from gtts import gTTS
+from intent_matcher import IntentMatcher
+from generator_pools import create_pools, render_metrics, PoolSaturated, GeneratorTimeout
+from tts_engine import TTSEngine
+from image_worker import DiffusionWorker, ImageQueueFull
+from ollama_client import OllamaClient, ModelBusy
 
 app = Flask(__name__)
 CORS(app)
+# Behind nginx/Apache, let the front server send output files (X-Sendfile)
+app.config["USE_X_SENDFILE"] = os.getenv("USE_X_SENDFILE") == "1"
 
 # ---- Initialize models ---- #
-ollama = ChatOllama(model="llama3", max_tokens=300)
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+ROUTER_TTS = os.getenv("ROUTER_TTS", "local")
+ROUTER_IMAGE = os.getenv("ROUTER_IMAGE", "local")
+# Built by init_models(), not at import: the TTS pool's spawned processes and the
+# check scripts import this module and need none of it
+pools = ollama = openai_client = local_tts = image_worker = intent_matcher = None
+models_lock = threading.Lock()
+
+
+def init_models():
+    """Build the pools, clients and local workers (once per process)."""
+    global pools, ollama, openai_client, local_tts, image_worker, intent_matcher
+    with models_lock:
+        if pools is not None:
+            return
+        # One bounded thread pool per generator type; the timeouts also bound the network calls
+        new_pools = create_pools()
+        # Streaming llama3 client: pooled connections, keep-alive pinning, per-model concurrency cap
+        ollama = OllamaClient(read_timeout=max(new_pools["TEXT"].timeout, new_pools["TRANSLATION"].timeout))
+        openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # AUDIO: "local" = offline pyttsx3 worker pool with a disk cache, "gtts" = Google TTS
+        local_tts = TTSEngine() if ROUTER_TTS == "local" else None
+        # IMAGE: "local" = resident Stable Diffusion worker on this machine, "remote" = the API below
+        image_worker = DiffusionWorker() if ROUTER_IMAGE == "local" else None
+        # Keyword table from intent_keywords.json, compiled into a single-pass matcher
+        intent_matcher = IntentMatcher.load()
+        pools = new_pools  # last: other threads take a non-None pools to mean everything is built
+
+
+@app.before_request
+def ensure_models():
+    # Served as a bare `app` (not through create_app), the first request builds them
+    if pools is None:
+        init_models()
+
 
 # Example Image model API (Replicate Stable Diffusion or any local endpoint)
 STABLE_DIFFUSION_API = "https://api-inference.huggingface.co/models/stabilityai/stable-diffusion-2"
@@ -20,15 +59,7 @@ HUGGINGFACE_TOKEN = os.getenv("HUGGINGFACE_TOKEN")
 
 # ---- Action Detection ---- #
 def detect_action(prompt: str):
-    norm = prompt.lower()
-    if any(k in norm for k in ["image", "draw", "photo", "picture", "illustrate"]):
-        return "IMAGE"
-    elif any(k in norm for k in ["audio", "text to speech", "tts", "convert to audio", "speak"]):
-        return "AUDIO"
-    elif "translate" in norm or "translation" in norm or re.search(r"from .* to .*", norm):
-        return "TRANSLATION"
-    else:
-        return "TEXT"
+    return intent_matcher.detect(prompt)
 
 
 # ---- Prompt Enrichment ---- #
@@ -43,38 +74,114 @@ def augment_prompt(prompt: str, action: str):
         return f"Provide a clear, concise, and structured response to: {prompt}"
 
 
+# ---- Output files ---- #
+# Every result gets its own file named by the SHA-256 of its bytes, so
+# concurrent requests never overwrite each other and a URL's content never
+# changes (safe to cache forever).
+OUTPUT_DIR = os.path.abspath(os.path.join("static", "outputs"))
+OUTPUT_TMP = os.path.join(OUTPUT_DIR, "tmp")
+OUTPUT_NAME = re.compile(r"[0-9a-f]{32}\.(mp3|wav|png)")
+
+def temp_output_path(ext):
+    os.makedirs(OUTPUT_TMP, exist_ok=True)
+    return os.path.join(OUTPUT_TMP, f"{uuid.uuid4().hex}{ext}")
+
+def output_name(path, ext):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return f"{sha.hexdigest()[:32]}{ext}"
+
+def store_output(tmp_path, ext):
+    """Move a finished temp file to its content-addressed name and return the name."""
+    name = output_name(tmp_path, ext)
+    # Atomic; if identical output already exists it is simply replaced by the same bytes
+    os.replace(tmp_path, os.path.join(OUTPUT_DIR, name))
+    return name
+
+def publish_output(path, ext):
+    """Like store_output, but leaves `path` in place (e.g. a TTS cache file)."""
+    name = output_name(path, ext)
+    target = os.path.join(OUTPUT_DIR, name)
+    if not os.path.exists(target):
+        tmp_path = temp_output_path(ext)
+        try:
+            os.link(path, tmp_path)  # no copy when both are on one filesystem
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target)
+    return name
+
+def output_url(name):
+    return url_for("serve_output", name=name, _external=True)
+
+
 # ---- Generators ---- #
 
 def generate_text(prompt: str):
-    resp = ollama.invoke([{"role": "user", "content": prompt}])
-    return resp.content
+    return ollama.chat([{"role": "user", "content": prompt}])
 
 def generate_translation(prompt: str):
-    resp = ollama.invoke([{"role": "user", "content": prompt}])
-    return resp.content
+    return ollama.chat([{"role": "user", "content": prompt}])
+
+def stream_text(prompt: str):
+    """Text chunks as the model produces them (TEXT and TRANSLATION)."""
+    return ollama.stream_chat([{"role": "user", "content": prompt}])
+
+def generator_for(action: str):
+    if action == "IMAGE":
+        return generate_image
+    elif action == "AUDIO":
+        return generate_audio
+    elif action == "TRANSLATION":
+        return generate_translation
+    else:
+        return generate_text
 
 def generate_audio(prompt: str):
-    os.makedirs("static", exist_ok=True)
-    filename = "static/generated_audio.mp3"
-    tts = gTTS(prompt)
-    tts.save(filename)
-    return filename
+    if local_tts is not None:
+        wav_path = local_tts.synthesize(prompt, timeout=pools["AUDIO"].timeout)
+        return output_url(publish_output(wav_path, ".wav"))
+    tmp_path = temp_output_path(".mp3")
+    tts = gTTS(prompt, timeout=pools["AUDIO"].timeout)
+    tts.save(tmp_path)
+    return output_url(store_output(tmp_path, ".mp3"))
 
 def generate_image(prompt: str):
-    headers = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
-    response = requests.post(STABLE_DIFFUSION_API, headers=headers, json={"inputs": prompt})
-    if response.status_code == 200:
-        # Save as image file
-        os.makedirs("static", exist_ok=True)
-        img_path = "static/generated_image.png"
-        with open(img_path, "wb") as f:
-            f.write(response.content)
-        return img_path
+    if image_worker is not None:
+        # start() is a no-op once the worker runs (start_warm_up starts it in create_app)
+        image_bytes = image_worker.start().generate(prompt, timeout=pools["IMAGE"].timeout)
     else:
-        return f"Image generation failed: {response.text}"
+        headers = {"Authorization": f"Bearer {HUGGINGFACE_TOKEN}"}
+        response = requests.post(STABLE_DIFFUSION_API, headers=headers, json={"inputs": prompt},
+                                 timeout=pools["IMAGE"].timeout)
+        if response.status_code != 200:
+            return f"Image generation failed: {response.text}"
+        image_bytes = response.content
+
+    # Save as image file
+    tmp_path = temp_output_path(".png")
+    with open(tmp_path, "wb") as f:
+        f.write(image_bytes)
+    return output_url(store_output(tmp_path, ".png"))
 
 
 # ---- API Route ---- #
+@app.route("/files/<name>")
+def serve_output(name):
+    if not OUTPUT_NAME.fullmatch(name):
+        abort(404)
+    path = os.path.join(OUTPUT_DIR, name)
+    if not os.path.isfile(path):
+        abort(404)
+    # conditional=True answers If-None-Match/If-Modified-Since with 304 and Range with 206;
+    # the file body goes out through the server's sendfile-capable file wrapper
+    response = send_file(path, conditional=True, etag=name.split(".")[0], max_age=31536000)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
 @app.route("/generate", methods=["POST"])
 def generate():
     data = request.get_json()
@@ -89,15 +196,10 @@ def generate():
     augmented_prompt = augment_prompt(prompt, action)
 
     try:
-        # Step 3: Route to model
-        if action == "IMAGE":
-            result = generate_image(augmented_prompt)
-        elif action == "AUDIO":
-            result = generate_audio(augmented_prompt)
-        elif action == "TRANSLATION":
-            result = generate_translation(augmented_prompt)
-        else:
-            result = generate_text(augmented_prompt)
+        # Step 3: Route to model, on that model's pool (with this request's
+        # context, since the file generators build URLs with url_for)
+        generator = generator_for(action)
+        result = pools[action].run(copy_current_request_context(generator), augmented_prompt)
 
         return jsonify({
             "action": action,
@@ -106,8 +208,150 @@ def generate():
         })
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return error_response(e)
+
+
+def error_response(e):
+    if isinstance(e, (PoolSaturated, ModelBusy)):
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+    if isinstance(e, ImageQueueFull):
+        return jsonify({"error": str(e)}), 503, {"Retry-After": str(pools["IMAGE"].retry_after())}
+    if isinstance(e, GeneratorTimeout):
+        return jsonify({"error": str(e)}), 504
+    return jsonify({"error": str(e)}), 500
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/generate/stream", methods=["POST"])
+def generate_stream():
+    """Server-sent events: meta, then token events (TEXT/TRANSLATION) or one
+    result event (IMAGE/AUDIO), then done with stage timings; error on failure."""
+    start = time.perf_counter()
+    data = request.get_json()
+    prompt = data.get("prompt", "").strip()
+    if not prompt:
+        return jsonify({"error": "Prompt is required"}), 400
+
+    action = detect_action(prompt)
+    augmented_prompt = augment_prompt(prompt, action)
+    routing_ms = (time.perf_counter() - start) * 1000
+
+    chunks, first, result = None, "", None
+    try:
+        if action in ("TEXT", "TRANSLATION"):
+            # Admitted and timed by the action's pool like the other generators, but run here
+            chunks = pools[action].stream(stream_text, augmented_prompt)
+            first = next(chunks, "")  # admission and the wait for a model slot, so "busy" is still a 503
+        else:
+            generator = generator_for(action)
+            result = pools[action].run(copy_current_request_context(generator), augmented_prompt)
+    except Exception as e:
+        return error_response(e)
+    first_token_ms = (time.perf_counter() - start) * 1000
+
+    def events():
+        yield sse("meta", {"action": action, "augmented_prompt": augmented_prompt, "routing_ms": routing_ms})
+        try:
+            if chunks is not None:
+                if first:
+                    yield sse("token", {"text": first})
+                for text in chunks:
+                    yield sse("token", {"text": text})
+            else:
+                yield sse("result", {"result": result})
+        except Exception as e:
+            yield sse("error", {"error": str(e)})
+        finally:
+            if chunks is not None:
+                chunks.close()  # client gone or done: free the pool and model slots, stop the upstream stream
+        yield sse("done", {"routing_ms": routing_ms, "first_token_ms": first_token_ms,
+                           "generation_ms": (time.perf_counter() - start) * 1000 - routing_ms})
+
+    return Response(stream_with_context(events()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/ready")
+def ready():
+    # 200 once the text model has been preloaded (see start_warm_up)
+    start_warm_up()
+    if ollama.ready.is_set():
+        return jsonify({"ready": True})
+    return jsonify({"ready": False, "error": ollama.warm_up_error}), 503
+
+
+@app.route("/ollama/stats")
+def ollama_stats():
+    return jsonify(ollama.report())
+
+
+@app.route("/pools/stats")
+def pool_stats():
+    return jsonify({name: pool.report() for name, pool in pools.items()})
+
+
+@app.route("/tts/stats")
+def tts_stats():
+    if local_tts is None:
+        return jsonify({"backend": ROUTER_TTS})
+    return jsonify({"backend": ROUTER_TTS, **local_tts.report()})
+
+
+@app.route("/image/stats")
+def image_stats():
+    if image_worker is None:
+        return jsonify({"backend": ROUTER_IMAGE})
+    return jsonify({"backend": ROUTER_IMAGE, **image_worker.report()})
+
+
+@app.route("/metrics")
+def metrics():
+    return render_metrics(pools), 200, {"Content-Type": "text/plain; version=0.0.4"}
+
+
+# ---- Warm-up ---- #
+warm_up_lock = threading.Lock()
+warm_up_thread = None
+
+
+def start_warm_up():
+    """Preload the models in the background; /ready calls it again to retry a failed text model load."""
+    global warm_up_thread
+    with warm_up_lock:
+        if ollama.ready.is_set() or (warm_up_thread is not None and warm_up_thread.is_alive()):
+            return
+        if warm_up_thread is None:
+            if local_tts is not None:
+                threading.Thread(target=local_tts.warm_up, daemon=True).start()
+            if image_worker is not None:
+                image_worker.start()  # loads the model in the background
+        # Preload llama3; /ready turns 200 when it is resident
+        warm_up_thread = threading.Thread(target=ollama.warm_up, daemon=True)
+        warm_up_thread.start()
+
+
+def create_app():
+    """The app with its models built and preloading in the background.
+
+        gunicorn "router_app:create_app()"
+        flask --app "router_app:create_app()" run
+    """
+    # `flask run --debug` also loads the app in the reloader's file-watcher process, which serves nothing
+    reloader_watcher = (os.environ.get("FLASK_RUN_FROM_CLI") == "true" and os.environ.get("FLASK_DEBUG") == "1"
+                        and os.environ.get("WERKZEUG_RUN_MAIN") != "true")
+    if reloader_watcher:
+        return app
+    init_models()
+    start_warm_up()
+    return app
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5400, debug=True)
+    debug = True
+    # The debug reloader also runs this block in its file-watcher process; set up only the server
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        create_app()
+    app.run(host="0.0.0.0", port=5400, debug=debug)
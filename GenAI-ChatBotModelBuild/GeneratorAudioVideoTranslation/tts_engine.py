@@ -0,0 +1,191 @@
+"""Offline text-to-speech for router_app: pyttsx3 in a process pool, with a disk cache.
+
+A pyttsx3 engine isn't thread-safe and is slow to start, so each worker
+process creates one engine on startup and keeps it warm for every job it
+runs. Finished audio is cached on disk under a hash of (text, voice,
+rate): a repeated request is a file lookup, and concurrent requests for
+the same key share one synthesis. The cache is trimmed oldest-first once
+it grows past TTS_CACHE_MAX_BYTES.
+
+pyttsx3 writes WAV on Linux (eSpeak) and Windows (SAPI5), so files are .wav.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import OrderedDict
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import wave
+import threading
+import time
+
+TTS_WORKERS = int(os.getenv("TTS_WORKERS", "2"))
+TTS_VOICE = os.getenv("TTS_VOICE") or None  # None = the engine's default voice
+TTS_RATE = int(os.getenv("TTS_RATE", "150"))
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join("static", "tts_cache"))
+TTS_CACHE_MAX_BYTES = int(os.getenv("TTS_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+# ---- Worker process side ---- #
+_engine = None
+_engine_error = None
+
+
+def _init_worker():
+    global _engine, _engine_error
+    sys.stdout = open(os.devnull, "w")  # pyttsx3 prints a line for every file it saves
+    try:
+        import pyttsx3
+        _engine = pyttsx3.init()
+        _engine.setProperty("volume", 1.0)
+        # The eSpeak driver sometimes drops a fresh engine's first utterance; spend it here
+        warm_path = os.path.join(tempfile.gettempdir(), f"tts-warm-{os.getpid()}.wav")
+        _engine.save_to_file("ready", warm_path)
+        _engine.runAndWait()
+        if os.path.exists(warm_path):
+            os.remove(warm_path)
+    except Exception as e:  # re-raised per job, so callers see why
+        _engine_error = e
+
+
+def _has_audio(path):
+    try:
+        with wave.open(path, "rb") as f:
+            return f.getnframes() > 0
+    except (OSError, EOFError, wave.Error):
+        return False
+
+
+def _synthesize(text, voice, rate, path):
+    if _engine is None:
+        raise RuntimeError(f"pyttsx3 engine unavailable: {_engine_error}")
+    start = time.perf_counter()
+    if voice:
+        _engine.setProperty("voice", voice)
+    _engine.setProperty("rate", rate)
+    # Write beside the target and rename, so the file is complete before anyone sees it
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        # The driver now and then drops an utterance or saves it without samples; try again
+        for attempt in range(3):
+            _engine.save_to_file(text, tmp_path)
+            _engine.runAndWait()
+            if _has_audio(tmp_path):
+                break
+        else:
+            raise RuntimeError("pyttsx3 produced no audio")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return time.perf_counter() - start
+
+
+def _ready():
+    return _engine is not None
+
+
+# ---- Router process side ---- #
+class TTSEngine:
+    def __init__(self, workers=TTS_WORKERS, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES,
+                 voice=TTS_VOICE, rate=TTS_RATE):
+        self.workers = workers
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.voice = voice
+        self.rate = rate
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # spawn, not fork: the router is multithreaded by the time the first worker starts
+        self.pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> Future of the synthesis in progress
+        # Cached files, least recently used first, with their sizes
+        self.files = OrderedDict()
+        entries = [e for e in os.scandir(self.cache_dir) if e.is_file() and e.name.endswith(".wav")]
+        for entry in sorted(entries, key=lambda e: e.stat().st_mtime):
+            self.files[entry.name] = entry.stat().st_size
+        self.bytes = sum(self.files.values())
+        self.started = time.monotonic()
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "coalesced": 0,
+                      "syntheses": 0, "synth_seconds": 0.0, "evictions": 0}
+
+    def warm_up(self):
+        """Start every worker process (and its engine) now instead of on the first requests."""
+        for ready in [self.pool.submit(_ready) for _ in range(self.workers)]:
+            ready.result()
+
+    def key(self, text, voice, rate):
+        return hashlib.sha256(json.dumps([text, voice, rate]).encode()).hexdigest()[:32]
+
+    def synthesize(self, text, voice=None, rate=None, timeout=None):
+        """Path of a WAV file speaking `text`, from the cache or freshly synthesized."""
+        voice = voice or self.voice
+        rate = rate or self.rate
+        name = self.key(text, voice, rate) + ".wav"
+        path = os.path.join(self.cache_dir, name)
+        with self.lock:
+            self.stats["requests"] += 1
+            if name in self.files and os.path.exists(path):
+                self.stats["hits"] += 1
+                self.files.move_to_end(name)
+                return path
+            self.stats["misses"] += 1
+            future = self.pending.get(name)
+            if future is None:
+                # Callers wait on their own future, settled after the bookkeeping in _finished
+                future = self.pending[name] = Future()
+                job = self.pool.submit(_synthesize, text, voice, rate, path)
+                job.add_done_callback(lambda job: self._finished(job, future, name, path))
+            else:
+                self.stats["coalesced"] += 1
+        future.result(timeout=timeout)
+        return path
+
+    def _finished(self, job, future, name, path):
+        # Whatever goes wrong here must still settle the future, or its callers wait forever
+        try:
+            if job.cancelled():
+                raise RuntimeError("TTS job cancelled")
+            if job.exception() is not None:
+                raise job.exception()
+            size = os.path.getsize(path)
+            with self.lock:
+                self.pending.pop(name, None)
+                self.stats["syntheses"] += 1
+                self.stats["synth_seconds"] += job.result()
+                self.bytes += size - self.files.pop(name, 0)
+                self.files[name] = size
+                while self.bytes > self.max_bytes and len(self.files) > 1:
+                    old, size = self.files.popitem(last=False)
+                    self.bytes -= size
+                    self.stats["evictions"] += 1
+                    try:
+                        os.remove(os.path.join(self.cache_dir, old))
+                    except FileNotFoundError:
+                        pass
+        except BaseException as e:
+            with self.lock:
+                self.pending.pop(name, None)
+            future.set_exception(e)
+            return
+        future.set_result(path)
+
+    def report(self):
+        with self.lock:
+            stats = dict(self.stats)
+            lookups = stats["hits"] + stats["misses"]
+            return {
+                **stats,
+                "workers": self.workers,
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                "avg_synth_seconds": stats["synth_seconds"] / stats["syntheses"] if stats["syntheses"] else None,
+                "syntheses_per_second": stats["syntheses"] / (time.monotonic() - self.started),
+                "cache_files": len(self.files),
+                "cache_bytes": self.bytes,
+            }
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
@@ -1,6 +1,40 @@
 import streamlit as st
 import requests
 import json # Import json for better error handling/display
+import os
+import time
+
+ROUTER_URL = os.getenv("ROUTER_URL", "http://localhost:5400")
+
+# The router answers with short names; the display below uses the long ones
+ACTION_NAMES = {
+    "IMAGE": "IMAGE_GENERATION",
+    "VIDEO": "VIDEO_GENERATION",
+    "AUDIO": "AUDIO_GENERATION",
+    "TEXT": "TEXT_GENERATION",
+}
+
+
+@st.cache_resource
+def get_session():
+    """One HTTP session per server process, so clicks reuse the router connection."""
+    return requests.Session()
+
+
+def iter_sse(response):
+    """Yield (event, data) pairs from a text/event-stream response."""
+    event, data = "message", []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == "":
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
 
 # --- Page Configuration ---
 st.set_page_config(
@@ -49,63 +83,116 @@ if st.button("🚀 Generate", use_container_width=True, type="primary"):
             try:
                 # 1. Classification & Routing Request
                 status.update(label="1/2: Sending prompt to router backend...", state="running")
-                
-                # Mock endpoint as per the user's requirement
-                router_url = "http://localhost:5400/generate"
-                
-                response = requests.post(router_url, json={"prompt": prompt})
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    action = data.get("action", "TEXT_GENERATION").upper()
-                    augmented_prompt = data.get("augmented_prompt", "N/A")
-                    result = data.get("result", "No result returned.")
 
-                    # 2. Output Presentation
-                    status.update(label=f"2/2: Capability detected: **{action}**", state="running")
+                # Streaming endpoint: text arrives token by token as server-sent events
+                router_url = f"{ROUTER_URL}/generate/stream"
+                started = time.perf_counter()
+                response = get_session().post(router_url, json={"prompt": prompt}, stream=True, timeout=(5, 300))
 
+                if response.status_code == 200:
+                    action, augmented_prompt, result = "TEXT_GENERATION", "N/A", None
+                    text, timings, first_byte = "", None, None
+                    error = None
+
+                    # Placeholders first, so a stream that ends early still has somewhere to show it
                     with output_container:
-                        st.subheader(f"✅ Capability: {action}")
-                        
+                        heading = st.empty()
                         # Display augmented prompt and metadata in an expander
-                        with st.expander("🔍 Prompt Details & Metadata"):
-                            st.markdown("**Detected Capability:**")
-                            st.code(action)
-                            st.markdown("**Augmented Prompt Sent to Generator:**")
-                            st.code(augmented_prompt, language='text')
+                        details = st.expander("🔍 Prompt Details & Metadata")
+                        st.markdown("---")
+                        output = st.empty()
+
+                    for event, data in iter_sse(response):
+                        if first_byte is None:
+                            first_byte = time.perf_counter() - started
+
+                        if event == "meta":
+                            action = ACTION_NAMES.get(data["action"], data["action"]).upper()
+                            augmented_prompt = data.get("augmented_prompt", "N/A")
+
+                            # 2. Output Presentation
+                            status.update(label=f"2/2: Capability detected: **{action}**", state="running")
+                            heading.subheader(f"✅ Capability: {action}")
+                            with details:
+                                st.markdown("**Detected Capability:**")
+                                st.code(action)
+                                st.markdown("**Augmented Prompt Sent to Generator:**")
+                                st.code(augmented_prompt, language='text')
+
+                        elif event == "token":
+                            # Render text as it arrives
+                            text += data["text"]
+                            output.markdown(text + "▌")
+
+                        elif event == "result":
+                            result = data["result"]
+
+                        elif event == "error":
+                            error = data["error"]
+
+                        elif event == "done":
+                            timings = data
+
+                    total = time.perf_counter() - started
+                    if error is None and timings is None:
+                        error = "the stream ended before the router finished"  # no done event
+                    if error is not None:
+                        # Show the failure in place of any partial output; there is no result to render
+                        output.error(f"❌ Generation failed: {error}", icon="🔥")
+                        status.update(label="Generation failed", state="error")
+
+                    else:
+                        if result is None:
+                            result = text or "No result returned."
 
                         # Handle different capabilities
-                        st.markdown("---")
-                        
-                        if action == "IMAGE_GENERATION":
-                            st.markdown("### 🖼️ Generated Image")
-                            # Assuming 'result' is a publicly accessible URL for the image
-                            st.image(result, caption=augmented_prompt[:50] + "...", use_container_width=True)
-
-                        elif action == "VIDEO_GENERATION":
-                            st.markdown("### 🎬 Generated Video")
-                            # Assuming 'result' is a publicly accessible URL for the video
-                            st.video(result)
-
-                        elif action == "AUDIO_GENERATION":
-                            st.markdown("### 🎧 Generated Audio")
-                            # Assuming 'result' is a publicly accessible URL for the audio file
-                            st.audio(result)
-                            
-                        elif action == "TRANSLATION":
-                            st.markdown("### 🌍 Translation Result")
-                            st.success(f"**Translated Output:**\n\n{result}")
-
-                        elif action == "TEXT_GENERATION":
-                            st.markdown("### 📝 Text Generation Output")
-                            st.info(result)
-                            
-                        else:
-                            st.markdown("### ❓ Unknown Output Type")
-                            st.write(result)
-                            
-                    status.update(label="✅ Generation Complete!", state="complete")
-                    
+                        with output.container():
+                            if action == "IMAGE_GENERATION":
+                                st.markdown("### 🖼️ Generated Image")
+                                # 'result' is a URL served by the router's /files route
+                                st.image(result, caption=augmented_prompt[:50] + "...", use_container_width=True)
+
+                            elif action == "VIDEO_GENERATION":
+                                st.markdown("### 🎬 Generated Video")
+                                # Assuming 'result' is a publicly accessible URL for the video
+                                st.video(result)
+
+                            elif action == "AUDIO_GENERATION":
+                                st.markdown("### 🎧 Generated Audio")
+                                # 'result' is a URL served by the router's /files route
+                                st.audio(result)
+
+                            elif action == "TRANSLATION":
+                                st.markdown("### 🌍 Translation Result")
+                                st.success(f"**Translated Output:**\n\n{result}")
+
+                            elif action == "TEXT_GENERATION":
+                                st.markdown("### 📝 Text Generation Output")
+                                st.info(result)
+
+                            else:
+                                st.markdown("### ❓ Unknown Output Type")
+                                st.write(result)
+
+                        # Per-stage timings: routing and generation as measured by the router,
+                        # transfer = what the browser-side wait adds on top (network, streaming)
+                        with details:
+                            st.markdown("**Timings:**")
+                            server_ms = timings.get("routing_ms", 0) + timings.get("generation_ms", 0)
+                            st.table({
+                                "stage": ["routing", "first output", "generation", "transfer", "total"],
+                                "ms": [
+                                    round(timings.get("routing_ms", 0), 1),
+                                    round(timings.get("first_token_ms", 0), 1),
+                                    round(timings.get("generation_ms", 0), 1),
+                                    round(max(0.0, total * 1000 - server_ms), 1),
+                                    round(total * 1000, 1),
+                                ],
+                            })
+                            st.caption(f"First byte after {first_byte * 1000:.0f} ms" if first_byte else "")
+
+                        status.update(label="✅ Generation Complete!", state="complete")
+
                 else:
                     # Handle non-200 responses
                     error_text = response.text
@@ -114,13 +201,15 @@ if st.button("🚀 Generate", use_container_width=True, type="primary"):
                         error_text = json.dumps(error_json, indent=2)
                     except:
                         pass
-                    
+
                     st.error(f"❌ Router Error ({response.status_code}):", icon="🔥")
                     st.code(error_text)
+                    if response.headers.get("Retry-After"):
+                        st.caption(f"The router is busy; try again in {response.headers['Retry-After']} s.")
                     status.update(label=f"Request failed with status {response.status_code}", state="error")
 
             except requests.exceptions.ConnectionError:
-                st.error("❌ Connection Error: Could not connect to the backend server at `http://localhost:5400/generate`. Please ensure your server is running.", icon="🔌")
+                st.error(f"❌ Connection Error: Could not connect to the backend server at `{ROUTER_URL}`. Please ensure your server is running.", icon="🔌")
                 status.update(label="Connection Failed", state="error")
             except Exception as e:
                 st.error(f"❌ An unexpected error occurred: {e}", icon="💥")
@@ -1,15 +1,147 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
-from openai import OpenAI
+from typing import Literal
+from openai import AsyncOpenAI
+from contextlib import asynccontextmanager, contextmanager
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import httpx
+import json
 import os
+import time
 import uuid
-import requests
 from pathlib import Path
 import base64
+import hashlib
+from intent_classifier import IntentClassifier
+from response_cache import ResponseCache, normalize_prompt
+from single_flight import SingleFlight
+from tee_stream import TeeStream
+from media_store import MediaStore, etag_matches
+from job_queue import JobQueue, TERMINAL
+from metrics import Registry, MetricsMiddleware, SIZE_BUCKETS
+from upstream_scheduler import UpstreamScheduler, UpstreamBusy, estimate_tokens
+from micro_batcher import MicroBatcher
+from shared_cache import SharedCache, SHARED_CACHE_PATH
 
-app = FastAPI()
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it no WebP/thumbnail variants are made
+    Image = None
+
+# Shared HTTP transport: keep-alive connections to the OpenAI API and the
+# image CDN are pooled and reused instead of being opened per request.
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=30.0,
+    ),
+    timeout=httpx.Timeout(120.0, connect=10.0),
+)
+
+# Per-model rate limits, adaptive concurrency and retries for upstream calls
+upstream = UpstreamScheduler()
+
+# OpenAI client (the scheduler does the retrying when it is enabled)
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client,
+                     max_retries=0 if upstream.enabled else 2)
+
+# Local intent classifier, loaded once at startup
+intent_classifier = IntentClassifier()
+
+# One cache file shared by every worker process: LLM intent decisions,
+# cached responses and the media store's index
+shared_cache = SharedCache() if SHARED_CACHE_PATH else None
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", "86400"))
+
+# Cache for repeated text/translation prompts
+response_cache = ResponseCache(shared=shared_cache)
+
+# Identical prompts arriving together share one upstream call
+single_flight = SingleFlight()
+
+# Concurrency limits per handler (image and TTS calls are the slow, expensive ones)
+LIMITS = {
+    "INTENT": asyncio.Semaphore(int(os.getenv("INTENT_CONCURRENCY", "64"))),
+    "TEXT": asyncio.Semaphore(int(os.getenv("TEXT_CONCURRENCY", "32"))),
+    "TRANSLATION": asyncio.Semaphore(int(os.getenv("TRANSLATION_CONCURRENCY", "32"))),
+    "IMAGE": asyncio.Semaphore(int(os.getenv("IMAGE_CONCURRENCY", "4"))),
+    "AUDIO": asyncio.Semaphore(int(os.getenv("AUDIO_CONCURRENCY", "8"))),
+}
+
+# ---- Metrics ---- #
+
+metrics = Registry()
+STAGE_SECONDS = metrics.histogram(
+    "api_stage_seconds", "Latency of each request stage by intent", ("intent", "stage"))
+INTENT_IN_FLIGHT = metrics.gauge(
+    "api_intent_in_flight", "Prompts currently being handled by intent", ("intent",))
+REQUESTS_IN_FLIGHT = metrics.gauge(
+    "api_requests_in_flight", "HTTP requests currently being served by endpoint", ("endpoint",))
+REQUESTS = metrics.counter(
+    "api_requests_total", "HTTP requests by endpoint and status code", ("endpoint", "status"))
+RESPONSE_BYTES = metrics.histogram(
+    "api_response_bytes", "HTTP response body size by endpoint", ("endpoint",), buckets=SIZE_BUCKETS)
+PAYLOAD_BYTES = metrics.histogram(
+    "api_payload_bytes", "Size of generated media by intent and form", ("intent", "kind"), buckets=SIZE_BUCKETS)
+UPSTREAM_ERRORS = metrics.counter(
+    "upstream_errors_total", "Failed upstream calls by model and exception type", ("model", "error"))
+UPSTREAM_TOKENS = metrics.counter(
+    "upstream_tokens_total", "Tokens reported by the upstream usage field", ("model", "kind"))
+
+@contextmanager
+def upstream_errors(model):
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.inc(model, type(e).__name__)
+        raise
+
+def intent_label(intent_type):
+    # LLM answers are free text; anything unexpected is routed (and labelled) as TEXT
+    return intent_type if intent_type in LIMITS and intent_type != "INTENT" else "TEXT"
+
+def record_usage(model, usage, estimated_tokens=0):
+    if usage is not None:
+        upstream.record_tokens(model, estimated_tokens, usage.total_tokens)
+        UPSTREAM_TOKENS.inc(model, "prompt", amount=usage.prompt_tokens or 0)
+        UPSTREAM_TOKENS.inc(model, "completion", amount=usage.completion_tokens or 0)
+
+# Paths with ids or file names are collapsed so label cardinality stays bounded
+METRIC_PREFIXES = ("/media/", "/static/", "/audio/stream/", "/jobs/")
+route_paths = set()
+
+def metric_endpoint(path):
+    if not route_paths:
+        route_paths.update(r.path for r in app.routes if "{" not in r.path)
+    if path in route_paths:
+        return path
+    for prefix in METRIC_PREFIXES:
+        if path.startswith(prefix):
+            return prefix + "*"
+    return "other"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    media_store.start_janitor()
+    workers = start_job_workers()
+    yield
+    for worker in workers:
+        worker.cancel()
+    media_store.stop_janitor()
+    await http_client.aclose()
+    variant_executor.shutdown(wait=False)
+    if shared_cache is not None:
+        await asyncio.to_thread(shared_cache.close)
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS
 app.add_middleware(
@@ -20,15 +152,43 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Outermost, so the in-flight gauge and response sizes cover every request
+app.add_middleware(
+    MetricsMiddleware,
+    in_flight=REQUESTS_IN_FLIGHT,
+    requests=REQUESTS,
+    response_bytes=RESPONSE_BYTES,
+    endpoint_of=metric_endpoint,
+)
+
+# Generated images and audio live in a content-addressed, size-capped store
+Path("static").mkdir(exist_ok=True)
+media_store = MediaStore(shared=shared_cache)
 
-# Create directories
-Path("static/images").mkdir(parents=True, exist_ok=True)
-Path("static/audio").mkdir(parents=True, exist_ok=True)
+# Per-intent parallelism inside one /process/batch request (the global LIMITS still apply)
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "5000"))
+BATCH_CONCURRENCY = {
+    "TEXT": int(os.getenv("BATCH_TEXT_CONCURRENCY", "8")),
+    "TRANSLATION": int(os.getenv("BATCH_TRANSLATION_CONCURRENCY", "8")),
+    "IMAGE": int(os.getenv("BATCH_IMAGE_CONCURRENCY", "2")),
+    "AUDIO": int(os.getenv("BATCH_AUDIO_CONCURRENCY", "4")),
+}
 
 class PromptRequest(BaseModel):
     prompt: str
+    # "inline" embeds generated media as base64; "url" returns only URLs
+    # (a /media URL for images, a live stream URL for audio)
+    response_mode: Literal["inline", "url"] = "inline"
+
+class JobRequest(BaseModel):
+    prompt: str
+    # Job results are read later, so media is returned as stored URLs by default
+    response_mode: Literal["inline", "url"] = "url"
+
+class BatchRequest(BaseModel):
+    prompts: list[str]
+    # Batches default to URLs; thousands of inline base64 images would be huge
+    response_mode: Literal["inline", "url"] = "url"
 
 @app.post("/process")
 async def process_prompt(request: PromptRequest):
@@ -38,132 +198,832 @@ async def process_prompt(request: PromptRequest):
     
     try:
         # Detect intent
-        intent = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Classify as: IMAGE, AUDIO, TRANSLATION, or TEXT"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=10
-        )
-        
-        intent_type = intent.choices[0].message.content.strip().upper()
+        intent_type = local_intent(prompt)
+        if intent_type is None and SPECULATIVE_TEXT:
+            # The LLM has to decide; start TEXT generation alongside it
+            return await speculate_text(prompt, request.response_mode)
+        if intent_type is None:
+            intent_type = await llm_intent(prompt)
         
         # Route to handler
-        if intent_type == "IMAGE":
-            return handle_image(prompt)
-        elif intent_type == "AUDIO":
-            return handle_audio(prompt)
-        elif intent_type == "TRANSLATION":
-            return handle_translation(prompt)
-        else:
-            return handle_text(prompt)
+        with STAGE_SECONDS.time(intent_label(intent_type), "total"):
+            return await route_intent(prompt, intent_type, request.response_mode)
             
+    except UpstreamBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
     except Exception as e:
         raise HTTPException(500, str(e))
 
-def handle_text(prompt):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "You are a helpful assistant."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.7,
-        max_tokens=500
-    )
+async def route_intent(prompt, intent_type, response_mode="inline"):
+    if intent_type == "IMAGE":
+        handler = lambda: handle_image(prompt, response_mode)
+    elif intent_type == "AUDIO":
+        handler = lambda: handle_audio(prompt, response_mode)
+    elif intent_type == "TRANSLATION":
+        handler = lambda: handle_translation(prompt)
+    else:
+        intent_type = "TEXT"
+        handler = lambda: handle_text(prompt)
+
+    key = (intent_type, normalize_prompt(prompt), response_mode)
+    INTENT_IN_FLIGHT.inc(intent_type)
+    try:
+        result = await single_flight.do(key, handler)
+    finally:
+        INTENT_IN_FLIGHT.dec(intent_type)
+    if intent_type == "TRANSLATION":
+        # The shared result may come from a prompt that differed in case/spacing
+        result = {**result, "original": extract_original(prompt)}
+    return result
+
+def local_intent(prompt):
+    """The local classifier's intent, or None when it isn't confident enough."""
+    start = time.perf_counter()
+    intent_type, confidence = intent_classifier.predict(prompt)
+    STAGE_SECONDS.observe(time.perf_counter() - start, intent_type or "UNKNOWN", "intent_local")
+    confident = intent_type is not None and confidence >= intent_classifier.threshold
+    intent_classifier.record(used_fallback=not confident)
+    return intent_type if confident else None
+
+async def detect_intent(prompt):
+    # Local classifier first; the LLM is only asked when it isn't confident
+    return local_intent(prompt) or await llm_intent(prompt)
+
+async def detect_intents(prompts):
+    """Classify a batch with one local call; only the unsure prompts go to the LLM.
+
+    LLM failures are returned in place of the intent so one bad prompt
+    doesn't fail the batch.
+    """
+    intents = []
+    fallback = {}
+    for i, (intent_type, confidence) in enumerate(intent_classifier.predict_many(prompts)):
+        confident = intent_type is not None and confidence >= intent_classifier.threshold
+        intent_classifier.record(used_fallback=not confident)
+        intents.append(intent_type if confident else None)
+        if not confident:
+            fallback[i] = llm_intent(prompts[i])
+
+    results = await asyncio.gather(*fallback.values(), return_exceptions=True)
+    for i, intent_type in zip(fallback, results):
+        intents[i] = intent_type
+    return intents
+
+async def llm_intent(prompt):
+    intent_key = hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+    if shared_cache is not None and (cached := await asyncio.to_thread(shared_cache.get, "intent", intent_key)):
+        return cached
+
+    start = time.perf_counter()
+    messages = [
+        {"role": "system", "content": "Classify as: IMAGE, AUDIO, TRANSLATION, or TEXT"},
+        {"role": "user", "content": prompt}
+    ]
+    tokens = estimate_tokens(messages, 10)
+    async with LIMITS["INTENT"]:
+        with upstream_errors("gpt-4o-mini"):
+            intent = await upstream.call("gpt-4o-mini", lambda: client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=messages,
+                temperature=0.3,
+                max_tokens=10
+            ), tokens)
+    record_usage("gpt-4o-mini", intent.usage, tokens)
+    intent_type = intent.choices[0].message.content.strip().upper()
+    STAGE_SECONDS.observe(time.perf_counter() - start, intent_label(intent_type), "intent_llm")
+    if shared_cache is not None:
+        await asyncio.to_thread(shared_cache.set, "intent", intent_key, intent_type, ttl=INTENT_CACHE_TTL)
+    return intent_type
+
+TEXT_SYSTEM_PROMPT = "You are a helpful assistant."
+TEXT_PARAMS = {"model": "gpt-4o-mini", "temperature": 0.7, "max_tokens": 500}
+
+async def handle_text(prompt):
+    cache_key = response_cache.key_for("TEXT", prompt, TEXT_PARAMS)
+    if cache_key and (cached := await response_cache.get_async(cache_key)):
+        return cached
+
+    messages = [
+        {"role": "system", "content": TEXT_SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    tokens = estimate_tokens(messages, TEXT_PARAMS["max_tokens"])
+    async with LIMITS["TEXT"]:
+        with STAGE_SECONDS.time("TEXT", "generation"), upstream_errors(TEXT_PARAMS["model"]):
+            response = await upstream.call(TEXT_PARAMS["model"], lambda: client.chat.completions.create(
+                messages=messages,
+                **TEXT_PARAMS
+            ), tokens)
+    record_usage(TEXT_PARAMS["model"], response.usage, tokens)
     
-    return {
+    result = {
         "intent": "Text Generation",
         "type": "text",
         "result": response.choices[0].message.content.strip()
     }
+    if cache_key:
+        await response_cache.set_async(cache_key, result)
+    return result
 
-def handle_image(prompt):
-    # Generate image
-    response = client.images.generate(
-        model="dall-e-3",
-        prompt=prompt,
-        size="1024x1024"
-    )
-    
-    # Download image
-    image_url = response.data[0].url
-    image_bytes = requests.get(image_url).content
+IMAGE_CHUNK_SIZE = 64 * 1024
+THUMBNAIL_SIZE = (256, 256)
+
+# Variant encoding is CPU and memory heavy, so it gets its own small pool
+# instead of competing with request work in the default executor
+variant_executor = ThreadPoolExecutor(max_workers=int(os.getenv("IMAGE_VARIANT_WORKERS", "1")))
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-run
+background_tasks = set()
+
+def run_in_background(executor, func, *args):
+    task = asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+
+async def download_to_file(url, filepath):
+    # Stream the body to disk chunk by chunk instead of holding the whole file
+    size = 0
+    async with http_client.stream("GET", url) as response:
+        response.raise_for_status()
+        with open(filepath, "wb") as f:
+            async for chunk in response.aiter_bytes(IMAGE_CHUNK_SIZE):
+                await asyncio.to_thread(f.write, chunk)
+                size += len(chunk)
+    return size
+
+def media_url(name):
+    return f"/media/{name}"
+
+def image_variant_names(name):
+    digest = name.split(".")[0]
+    return {"webp": f"{digest}.webp", "thumbnail": f"{digest}_thumb.jpg"}
+
+def make_image_variants(name):
+    if Image is None:
+        return
+    names = image_variant_names(name)
+    if all(media_store.open(n) for n in names.values()):
+        return  # Deduplicated image whose variants are already stored
+    try:
+        with Image.open(media_store.path(name)) as image:
+            image = image.convert("RGB")
+            webp_tmp = media_store.temp_path(".webp")
+            image.save(webp_tmp, "WEBP", quality=80, method=4)
+            media_store.attach(name, names["webp"], webp_tmp)
+            image.thumbnail(THUMBNAIL_SIZE)
+            thumbnail_tmp = media_store.temp_path(".jpg")
+            image.save(thumbnail_tmp, "JPEG", quality=80, optimize=True)
+            media_store.attach(name, names["thumbnail"], thumbnail_tmp)
+    except Exception as e:
+        print(f"Could not create variants for {name}: {e}")
+
+async def handle_image(prompt, response_mode="inline"):
+    async with LIMITS["IMAGE"]:
+        # Generate image
+        with STAGE_SECONDS.time("IMAGE", "generation"), upstream_errors("dall-e-3"):
+            response = await upstream.call("dall-e-3", lambda: client.images.generate(
+                model="dall-e-3",
+                prompt=prompt,
+                size="1024x1024"
+            ))
+        
+        # Download image
+        image_url = response.data[0].url
+        with STAGE_SECONDS.time("IMAGE", "download"), upstream_errors("image-download"):
+            if response_mode != "inline":
+                tmp_path = media_store.temp_path(".png")
+                size = await download_to_file(image_url, tmp_path)
+            else:
+                download = await http_client.get(image_url)
+                download.raise_for_status()
+                image_bytes = download.content
+                size = len(image_bytes)
+        PAYLOAD_BYTES.observe(size, "IMAGE", "download")
+
+    if response_mode != "inline":
+        with STAGE_SECONDS.time("IMAGE", "write"):
+            name = await asyncio.to_thread(media_store.put_file, tmp_path, ".png")
+        # Compressed variants are produced after the response has gone out
+        run_in_background(variant_executor, make_image_variants, name)
+        variants = image_variant_names(name) if Image is not None else {}
+        return {
+            "intent": "Image Generation",
+            "type": "image",
+            "result": "Image generated successfully",
+            "file_path": media_store.path(name).as_posix(),
+            "image_url": media_url(name),
+            "variants": {kind: media_url(n) for kind, n in variants.items()}
+        }
     
-    # Save file
-    filename = f"generated_{uuid.uuid4().hex}.png"
-    filepath = f"static/images/{filename}"
-    with open(filepath, "wb") as f:
-        f.write(image_bytes)
+    # Save file (disk I/O and encoding run off the event loop)
+    with STAGE_SECONDS.time("IMAGE", "write"):
+        name = await asyncio.to_thread(media_store.put_bytes, image_bytes, ".png")
     
     # Convert to base64
-    image_base64 = base64.b64encode(image_bytes).decode('utf-8')
+    with STAGE_SECONDS.time("IMAGE", "encode"):
+        image_base64 = (await asyncio.to_thread(base64.b64encode, image_bytes)).decode('utf-8')
+    PAYLOAD_BYTES.observe(len(image_base64), "IMAGE", "base64")
     
     return {
         "intent": "Image Generation",
         "type": "image",
         "result": "Image generated successfully",
-        "file_path": filepath,
+        "file_path": media_store.path(name).as_posix(),
         "image_data": f"data:image/png;base64,{image_base64}"
     }
 
-def handle_translation(prompt):
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Translate English to Marathi. Return only the translation."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.3,
-        max_tokens=500
-    )
-    
-    marathi_text = response.choices[0].message.content.strip()
-    
-    # Extract original text
-    original = prompt
+TRANSLATION_SYSTEM_PROMPT = "Translate English to Marathi. Return only the translation."
+TRANSLATION_PARAMS = {"model": "gpt-4o-mini", "temperature": 0.3, "max_tokens": 500}
+
+def extract_original(prompt):
     if ":" in prompt and "translate" in prompt.lower():
-        original = prompt.split(":", 1)[1].strip()
+        return prompt.split(":", 1)[1].strip()
+    return prompt
+
+# Concurrent translations are collected for a few ms and sent as one
+# multi-segment call (0 disables batching)
+TRANSLATION_BATCH_WINDOW_MS = float(os.getenv("TRANSLATION_BATCH_WINDOW_MS", "5"))
+TRANSLATION_BATCH_MAX = int(os.getenv("TRANSLATION_BATCH_MAX", "16"))
+TRANSLATION_BATCH_SYSTEM_PROMPT = (
+    "Translate each English segment in the JSON array to Marathi. "
+    "Return one translation per segment, in the same order."
+)
+TRANSLATION_BATCH_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "translations",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {"translations": {"type": "array", "items": {"type": "string"}}},
+            "required": ["translations"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+async def translate_one(text):
+    messages = [
+        {"role": "system", "content": TRANSLATION_SYSTEM_PROMPT},
+        {"role": "user", "content": text}
+    ]
+    tokens = estimate_tokens(messages, TRANSLATION_PARAMS["max_tokens"])
+    async with LIMITS["TRANSLATION"]:
+        with STAGE_SECONDS.time("TRANSLATION", "generation"), upstream_errors(TRANSLATION_PARAMS["model"]):
+            response = await upstream.call(TRANSLATION_PARAMS["model"], lambda: client.chat.completions.create(
+                messages=messages,
+                **TRANSLATION_PARAMS
+            ), tokens)
+    record_usage(TRANSLATION_PARAMS["model"], response.usage, tokens)
+    return response.choices[0].message.content.strip()
+
+async def translate_batch(texts):
+    if len(texts) == 1:
+        return [await translate_one(texts[0])]
+
+    messages = [
+        {"role": "system", "content": TRANSLATION_BATCH_SYSTEM_PROMPT},
+        {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}
+    ]
+    params = {**TRANSLATION_PARAMS, "max_tokens": TRANSLATION_PARAMS["max_tokens"] * len(texts)}
+    # Reserve like a single call; the quota is settled from the real usage afterwards
+    tokens = estimate_tokens(messages, TRANSLATION_PARAMS["max_tokens"])
+    async with LIMITS["TRANSLATION"]:
+        with STAGE_SECONDS.time("TRANSLATION", "generation"), upstream_errors(params["model"]):
+            response = await upstream.call(params["model"], lambda: client.chat.completions.create(
+                messages=messages,
+                response_format=TRANSLATION_BATCH_FORMAT,
+                **params
+            ), tokens)
+    record_usage(params["model"], response.usage, tokens)
+
+    try:
+        translations = json.loads(response.choices[0].message.content)["translations"]
+    except (TypeError, ValueError, KeyError):
+        translations = None
+    if not isinstance(translations, list) or len(translations) != len(texts):
+        # Segments were merged or dropped; translate them one by one instead
+        return await asyncio.gather(*(translate_one(t) for t in texts))
+    return [str(t).strip() for t in translations]
+
+translation_batcher = MicroBatcher(translate_batch, TRANSLATION_BATCH_WINDOW_MS / 1000, TRANSLATION_BATCH_MAX)
+
+async def handle_translation(prompt):
+    original = extract_original(prompt)
+
+    # Keys are case/whitespace-insensitive, so "original" always comes from this prompt
+    cache_key = response_cache.key_for("TRANSLATION", prompt, TRANSLATION_PARAMS)
+    if cache_key and (cached := await response_cache.get_async(cache_key)):
+        return {**cached, "original": original}
+
+    # Only the text to translate goes upstream, batched or not, so a prompt always gets the same input
+    if translation_batcher.window > 0:
+        marathi_text = await translation_batcher.submit(original)
+    else:
+        marathi_text = await translate_one(original)
     
-    return {
+    result = {
         "intent": "Translation (English → Marathi)",
         "type": "translation",
         "result": marathi_text,
         "original": original
     }
+    if cache_key:
+        await response_cache.set_async(cache_key, result)
+    return result
 
-def handle_audio(prompt):
-    # Extract text to speak
-    text = prompt
+AUDIO_CHUNK_SIZE = 16 * 1024
+
+# TTS streams still being generated, and media names of finished ones, by audio id
+active_speech = {}
+finished_speech = OrderedDict()
+FINISHED_SPEECH_LIMIT = 10000
+
+def extract_speech_text(prompt):
     if ":" in prompt:
-        text = prompt.split(":", 1)[1].strip()
+        return prompt.split(":", 1)[1].strip()
+    return prompt
+
+async def speech_chunks(text):
+    # Admitted but not retried: once bytes have reached a listener the stream can't restart
+    async with LIMITS["AUDIO"], upstream.slot("tts-1", measure_latency=False):
+        async with client.audio.speech.with_streaming_response.create(
+            model="tts-1",
+            voice="alloy",
+            input=text
+        ) as response:
+            async for chunk in response.iter_bytes(AUDIO_CHUNK_SIZE):
+                yield chunk
+
+async def record_speech(audio_id, tee, text):
+    with STAGE_SECONDS.time("AUDIO", "generation"):
+        await tee.pump(speech_chunks(text))
+    if tee.error is None:
+        PAYLOAD_BYTES.observe(os.path.getsize(tee.filepath), "AUDIO", "file")
+        with STAGE_SECONDS.time("AUDIO", "write"):
+            finished_speech[audio_id] = await asyncio.to_thread(media_store.put_file, tee.filepath, ".mp3")
+    else:
+        UPSTREAM_ERRORS.inc("tts-1", type(tee.error).__name__)
+    if len(finished_speech) > FINISHED_SPEECH_LIMIT:
+        finished_speech.popitem(last=False)
+
+def start_speech(text):
+    """Start TTS in the background, teeing it into the media store; returns the audio id."""
+    audio_id = f"audio_{uuid.uuid4().hex}"
+    tee = TeeStream(str(media_store.temp_path(".mp3")))
+    active_speech[audio_id] = tee
+    task = asyncio.create_task(record_speech(audio_id, tee, text))
+    background_tasks.add(task)
+
+    def finished(task):
+        background_tasks.discard(task)
+        active_speech.pop(audio_id, None)
+
+    task.add_done_callback(finished)
+    return audio_id
+
+def speech_response(audio_id):
+    return StreamingResponse(
+        active_speech[audio_id].read(),
+        media_type="audio/mpeg",
+        headers={"Cache-Control": "no-store", "X-Audio-Url": f"/audio/stream/{audio_id}"},
+    )
+
+async def handle_audio(prompt, response_mode="inline"):
+    # Extract text to speak
+    text = extract_speech_text(prompt)
+
+    if response_mode == "url":
+        # Generation starts now; the client plays stream_url while it is produced
+        audio_id = start_speech(text)
+        return {
+            "intent": "Text-to-Speech",
+            "type": "audio",
+            "result": f"Audio generated for: {text[:100]}",
+            "stream_url": f"/audio/stream/{audio_id}"
+        }
     
     # Generate audio
-    filename = f"audio_{uuid.uuid4().hex}.mp3"
-    filepath = f"static/audio/{filename}"
+    async with LIMITS["AUDIO"]:
+        with STAGE_SECONDS.time("AUDIO", "generation"), upstream_errors("tts-1"):
+            response = await upstream.call("tts-1", lambda: client.audio.speech.create(
+                model="tts-1",
+                voice="alloy",
+                input=text
+            ))
+            audio_bytes = response.content
+    PAYLOAD_BYTES.observe(len(audio_bytes), "AUDIO", "file")
     
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice="alloy",
-        input=text
-    )
-    
-    response.stream_to_file(filepath)
+    with STAGE_SECONDS.time("AUDIO", "write"):
+        name = await asyncio.to_thread(media_store.put_bytes, audio_bytes, ".mp3")
+
+    if response_mode == "file":
+        # Used by jobs: the finished file's URL rather than a live stream or base64
+        return {
+            "intent": "Text-to-Speech",
+            "type": "audio",
+            "result": f"Audio generated for: {text[:100]}",
+            "file_path": media_store.path(name).as_posix(),
+            "audio_url": media_url(name)
+        }
     
     # Convert to base64
-    with open(filepath, "rb") as f:
-        audio_base64 = base64.b64encode(f.read()).decode('utf-8')
+    with STAGE_SECONDS.time("AUDIO", "encode"):
+        audio_base64 = base64.b64encode(audio_bytes).decode('utf-8')
+    PAYLOAD_BYTES.observe(len(audio_base64), "AUDIO", "base64")
     
     return {
         "intent": "Text-to-Speech",
         "type": "audio",
         "result": f"Audio generated for: {text[:100]}",
-        "file_path": filepath,
+        "file_path": media_store.path(name).as_posix(),
         "audio_data": f"data:audio/mpeg;base64,{audio_base64}"
     }
 
+@app.post("/audio/stream")
+async def stream_audio(request: PromptRequest):
+    text = extract_speech_text(request.prompt.strip())
+    if not text:
+        raise HTTPException(400, "Prompt cannot be empty")
+    return speech_response(start_speech(text))
+
+@app.get("/audio/stream/{audio_id}")
+async def stream_audio_by_id(audio_id: str):
+    if audio_id in active_speech:
+        return speech_response(audio_id)
+    # Finished: serve the stored file (FileResponse answers Range requests)
+    name = finished_speech.get(audio_id)
+    filepath = await asyncio.to_thread(media_store.open, name) if name else None
+    if filepath is None:
+        raise HTTPException(404, "Audio not found")
+    return FileResponse(filepath, media_type="audio/mpeg")
+
+# ---- Speculative TEXT ---- #
+
+# When the LLM intent call is needed, start TEXT generation at the same time
+# (most traffic is TEXT). Right guesses save the intent round trip; wrong
+# ones cost a cancelled (or, if it finished first, discarded) text call.
+SPECULATIVE_TEXT = os.getenv("SPECULATIVE_TEXT", "0") == "1"
+speculation_counts = {"started": 0, "hits": 0, "misses": 0, "cancelled": 0,
+                      "saved_seconds": 0.0, "wasted_seconds": 0.0}
+
+async def speculate_text(prompt, response_mode="inline"):
+    start = time.perf_counter()
+    speculation_counts["started"] += 1
+
+    async def run_text():
+        # Not coalesced: cancelling a wrong guess must not cancel another caller's call
+        result = await handle_text(prompt)
+        return result, time.perf_counter() - start
+
+    text_task = asyncio.create_task(run_text())
+    try:
+        intent_type = intent_label(await llm_intent(prompt))
+    except BaseException:
+        text_task.cancel()
+        raise
+    intent_seconds = time.perf_counter() - start
+
+    if intent_type == "TEXT":
+        result, text_seconds = await text_task
+        speculation_counts["hits"] += 1
+        # Sequential would have taken intent + text; overlapped it took the longer of the two
+        speculation_counts["saved_seconds"] += min(intent_seconds, text_seconds)
+        STAGE_SECONDS.observe(time.perf_counter() - start, "TEXT", "total")
+        return result
+
+    speculation_counts["misses"] += 1
+    if text_task.done():
+        # exception() raises CancelledError on a cancelled task, so check that first
+        if not text_task.cancelled() and text_task.exception() is None:
+            speculation_counts["wasted_seconds"] += text_task.result()[1]
+    else:
+        text_task.cancel()
+        speculation_counts["cancelled"] += 1
+        speculation_counts["wasted_seconds"] += intent_seconds
+    with STAGE_SECONDS.time(intent_type, "total"):
+        return await route_intent(prompt, intent_type, response_mode)
+
+@app.get("/speculation/stats")
+def speculation_stats():
+    started = speculation_counts["started"]
+    return {
+        "enabled": SPECULATIVE_TEXT,
+        **speculation_counts,
+        "hit_rate": speculation_counts["hits"] / started if started else 0.0,
+        # Each miss is one text call that a sequential request would not have made
+        "extra_upstream_calls": speculation_counts["misses"],
+        "extra_calls_per_request": speculation_counts["misses"] / started if started else 0.0,
+        "avg_saved_ms": 1000 * speculation_counts["saved_seconds"] / speculation_counts["hits"]
+                        if speculation_counts["hits"] else 0.0,
+    }
+
+# ---- Media store ---- #
+
+@app.get("/media/stats")
+def media_stats():
+    return media_store.report()
+
+@app.get("/media/{name}")
+def serve_media(name: str, request: Request):
+    filepath = media_store.open(name)
+    if filepath is None:
+        raise HTTPException(404, "Media not found")
+    # Names are content hashes, so a URL's bytes never change
+    headers = {"ETag": f'"{filepath.stem}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(filepath, headers=headers)
+
+# ---- Streaming (SSE) ---- #
+
+INTENT_LABELS = {
+    "TEXT": ("Text Generation", "text"),
+    "TRANSLATION": ("Translation (English → Marathi)", "translation"),
+    "IMAGE": ("Image Generation", "image"),
+    "AUDIO": ("Text-to-Speech", "audio"),
+}
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def stream_chat(intent_type, prompt, system_prompt, params, meta):
+    """Yield completion deltas for TEXT/TRANSLATION, using the same cache as the JSON handlers."""
+    cache_key = response_cache.key_for(intent_type, prompt, params)
+    if cache_key and (cached := await response_cache.get_async(cache_key)):
+        meta["cached"] = True
+        yield cached["result"]
+        return
+
+    parts = []
+    messages = [
+        {"role": "system", "content": system_prompt},
+        # Translations send only the text to translate, as handle_translation does
+        {"role": "user", "content": extract_original(prompt) if intent_type == "TRANSLATION" else prompt}
+    ]
+    tokens = estimate_tokens(messages, params["max_tokens"])
+    async with LIMITS[intent_type]:
+        start = time.perf_counter()
+        with STAGE_SECONDS.time(intent_type, "generation"), upstream_errors(params["model"]):
+            # Admission and retries cover opening the stream (a 429 arrives before any token)
+            stream = await upstream.call(params["model"], lambda: client.chat.completions.create(
+                messages=messages,
+                stream=True,
+                stream_options={"include_usage": True},
+                **params
+            ), tokens)
+            async for chunk in stream:
+                if chunk.usage:
+                    meta["usage"] = chunk.usage.model_dump()
+                    record_usage(params["model"], chunk.usage, tokens)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if not parts:
+                        STAGE_SECONDS.observe(time.perf_counter() - start, intent_type, "first_token")
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+
+    if cache_key:
+        label, result_type = INTENT_LABELS[intent_type]
+        result = {"intent": label, "type": result_type, "result": "".join(parts).strip()}
+        if intent_type == "TRANSLATION":
+            result["original"] = extract_original(prompt)
+        await response_cache.set_async(cache_key, result)
+
+async def stream_events(prompt, intent_type, response_mode="inline"):
+    start = time.perf_counter()
+    label, result_type = INTENT_LABELS.get(intent_type, INTENT_LABELS["TEXT"])
+    meta = {"intent": label, "type": result_type, "cached": False}
+    if intent_type == "TRANSLATION":
+        meta["original"] = extract_original(prompt)
+    yield sse("intent", {key: meta[key] for key in ("intent", "type", "original") if key in meta})
+
+    try:
+        if intent_type in ("IMAGE", "AUDIO"):
+            # Nothing to stream token by token; send the finished result as one event
+            yield sse("result", await route_intent(prompt, intent_type, response_mode))
+        else:
+            if intent_type == "TRANSLATION":
+                system_prompt, params = TRANSLATION_SYSTEM_PROMPT, TRANSLATION_PARAMS
+            else:
+                intent_type = "TEXT"
+                system_prompt, params = TEXT_SYSTEM_PROMPT, TEXT_PARAMS
+            meta["model"] = params["model"]
+            async for delta in stream_chat(intent_type, prompt, system_prompt, params, meta):
+                meta.setdefault("first_token_ms", round((time.perf_counter() - start) * 1000, 1))
+                yield sse("token", {"delta": delta})
+    except Exception as e:
+        yield sse("error", {"detail": str(e)})
+        return
+
+    elapsed = time.perf_counter() - start
+    STAGE_SECONDS.observe(elapsed, intent_label(intent_type), "total")
+    meta["total_ms"] = round(elapsed * 1000, 1)
+    yield sse("done", meta)
+
+@app.post("/process/stream")
+async def process_prompt_stream(request: PromptRequest):
+    prompt = request.prompt.strip()
+    if not prompt:
+        raise HTTPException(400, "Prompt cannot be empty")
+
+    try:
+        intent_type = await detect_intent(prompt)
+    except UpstreamBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+    return StreamingResponse(
+        stream_events(prompt, intent_type, request.response_mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+# ---- Batch (NDJSON) ---- #
+
+async def run_batch_item(index, prompt, intent_type, response_mode, limit):
+    line = {"index": index, "intent": intent_type, "status": "ok"}
+    try:
+        if isinstance(intent_type, Exception):
+            line["intent"] = None
+            raise intent_type
+        async with limit:
+            line["result"] = await route_intent(prompt, intent_type, response_mode)
+    except Exception as e:
+        line["status"] = "error"
+        line["error"] = str(e) or type(e).__name__
+    return line
+
+async def batch_lines(prompts, response_mode):
+    # Empty prompts are reported per item instead of rejecting the batch
+    valid = [i for i, p in enumerate(prompts) if p]
+    for i, prompt in enumerate(prompts):
+        if not prompt:
+            yield json.dumps({"index": i, "intent": None, "status": "error",
+                              "error": "Prompt cannot be empty"}) + "\n"
+
+    intents = await detect_intents([prompts[i] for i in valid]) if valid else []
+
+    # Group by intent so each intent fans out with its own parallelism bound
+    groups = {}
+    for i, intent_type in zip(valid, intents):
+        key = intent_type if intent_type in BATCH_CONCURRENCY else "TEXT"
+        groups.setdefault(key, []).append((i, intent_type))
+
+    tasks = []
+    for key, items in groups.items():
+        limit = asyncio.Semaphore(BATCH_CONCURRENCY[key])
+        for i, intent_type in items:
+            tasks.append(asyncio.create_task(
+                run_batch_item(i, prompts[i], intent_type, response_mode, limit)))
+
+    try:
+        # Completion order; callers reorder by "index"
+        for finished in asyncio.as_completed(tasks):
+            yield json.dumps(await finished, ensure_ascii=False) + "\n"
+    finally:
+        # Client went away: don't keep generating for nobody
+        for task in tasks:
+            task.cancel()
+
+@app.post("/process/batch")
+async def process_batch(request: BatchRequest):
+    if len(request.prompts) > BATCH_MAX_PROMPTS:
+        raise HTTPException(400, f"At most {BATCH_MAX_PROMPTS} prompts per batch")
+    prompts = [p.strip() for p in request.prompts]
+    return StreamingResponse(batch_lines(prompts, request.response_mode), media_type="application/x-ndjson")
+
+# ---- Jobs ---- #
+
+JOB_WORKERS = {
+    "IMAGE": int(os.getenv("JOB_IMAGE_WORKERS", "2")),
+    "AUDIO": int(os.getenv("JOB_AUDIO_WORKERS", "2")),
+    "TEXT": int(os.getenv("JOB_TEXT_WORKERS", "1")),
+    "TRANSLATION": int(os.getenv("JOB_TRANSLATION_WORKERS", "1")),
+}
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+# Idle workers re-check the queue this often (catches expired leases and other processes' jobs)
+JOB_POLL_INTERVAL = 1.0
+JOB_MAX_WAIT = 60
+
+job_queue = JobQueue()
+job_ready = {intent: asyncio.Event() for intent in JOB_WORKERS}
+job_finished = {}  # job id -> Event for long-poll/SSE waiters in this process
+
+def notify_job(job_id):
+    event = job_finished.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+async def keep_lease(job_id, worker_id):
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await asyncio.to_thread(job_queue.heartbeat, job_id, worker_id, JOB_LEASE_SECONDS)
+
+async def job_worker(intent_type, worker_id):
+    while True:
+        job_ready[intent_type].clear()
+        job = await asyncio.to_thread(job_queue.claim, intent_type, worker_id, JOB_LEASE_SECONDS)
+        if job is None:
+            try:
+                await asyncio.wait_for(job_ready[intent_type].wait(), JOB_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        heartbeat = asyncio.create_task(keep_lease(job["id"], worker_id))
+        try:
+            # Jobs ask for stored files ("file") instead of live stream URLs
+            mode = "file" if job["response_mode"] == "url" else job["response_mode"]
+            result = await route_intent(job["prompt"], intent_type, mode)
+            await asyncio.to_thread(job_queue.complete, job["id"], worker_id, result)
+        except Exception as e:
+            await asyncio.to_thread(job_queue.fail, job["id"], worker_id, str(e) or type(e).__name__)
+        finally:
+            heartbeat.cancel()
+            notify_job(job["id"])
+
+def start_job_workers():
+    workers = []
+    for intent_type, count in JOB_WORKERS.items():
+        for n in range(count):
+            worker_id = f"{os.getpid()}-{intent_type.lower()}-{n}"
+            workers.append(asyncio.create_task(job_worker(intent_type, worker_id)))
+    return workers
+
+async def wait_for_job(job_id, timeout):
+    """Return the job once it is finished, or its current state when `timeout` runs out."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = await asyncio.to_thread(job_queue.get, job_id)
+        remaining = deadline - time.monotonic()
+        if job is None or job["status"] in TERMINAL or remaining <= 0:
+            return job
+        event = job_finished.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), min(remaining, JOB_POLL_INTERVAL))
+        except asyncio.TimeoutError:
+            pass
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    prompt = request.prompt.strip()
+    if not prompt:
+        raise HTTPException(400, "Prompt cannot be empty")
+
+    try:
+        intent_type = await detect_intent(prompt)
+    except UpstreamBusy as e:
+        raise HTTPException(503, str(e), headers={"Retry-After": str(e.retry_after)})
+    except Exception as e:
+        raise HTTPException(500, str(e))
+    if intent_type not in JOB_WORKERS:
+        intent_type = "TEXT"
+
+    job_id = await asyncio.to_thread(job_queue.enqueue, intent_type, prompt, request.response_mode)
+    job_ready[intent_type].set()
+    return {
+        "job_id": job_id,
+        "intent": intent_type,
+        "status": "queued",
+        "status_url": f"/jobs/{job_id}",
+        "events_url": f"/jobs/{job_id}/events"
+    }
+
+@app.get("/jobs/stats")
+async def job_stats():
+    return await asyncio.to_thread(job_queue.report)
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    # wait > 0 long-polls until the job finishes or the wait runs out
+    job = await wait_for_job(job_id, min(max(wait, 0), JOB_MAX_WAIT))
+    if job is None:
+        raise HTTPException(404, "Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(404, "Job not found")
+
+    async def events():
+        last_status = None
+        current = job
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                yield sse("status", current)
+            if current["status"] in TERMINAL:
+                return
+            current = await wait_for_job(job_id, JOB_MAX_WAIT)
+            if current is None:
+                return
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # Serve static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -175,7 +1035,78 @@ def root():
 def health():
     return {"status": "healthy", "api_key_set": bool(os.getenv("OPENAI_API_KEY"))}
 
+@app.get("/intent/stats")
+def intent_stats():
+    return intent_classifier.report()
+
+@app.get("/cache/stats")
+def cache_stats():
+    return response_cache.report()
+
+@app.get("/cache/shared/stats")
+def shared_cache_stats():
+    return shared_cache.report() if shared_cache is not None else {"enabled": False}
+
+@app.get("/coalesce/stats")
+def coalesce_stats():
+    return single_flight.report()
+
+@app.get("/upstream/stats")
+def upstream_stats():
+    return upstream.report()
+
+@app.get("/translation/batch/stats")
+def translation_batch_stats():
+    return translation_batcher.report()
+
+@metrics.collector
+def component_metrics():
+    """Counters the components already keep, read at scrape time."""
+    cache = response_cache.report()
+    media = media_store.report()
+    shared = shared_cache.report() if shared_cache is not None else {}
+    return [
+        ("shared_cache_hits_total", "counter", "Shared cache hits, all workers, by who wrote the entry",
+         ("namespace", "writer"),
+         {**{(ns, "same_worker"): s["hits"] - s["cross_worker_hits"] for ns, s in shared.items()},
+          **{(ns, "other_worker"): s["cross_worker_hits"] for ns, s in shared.items()}}),
+        ("shared_cache_misses_total", "counter", "Shared cache misses, all workers", ("namespace",),
+         {(ns,): s["misses"] for ns, s in shared.items()}),
+        ("intent_classifications_total", "counter", "Intent decisions by source", ("source",),
+         {("local",): intent_classifier.stats["local"], ("llm",): intent_classifier.stats["fallback"]}),
+        ("cache_lookups_total", "counter", "Response cache lookups by outcome", ("outcome",),
+         {(k,): cache[k] for k in ("memory_hits", "shared_hits", "misses")}),
+        ("cache_bytes", "gauge", "Bytes held in the in-memory response cache", (), {(): cache["bytes"]}),
+        ("coalesce_calls_total", "counter", "Single-flight calls by role", ("role",),
+         {("leader",): single_flight.stats["leaders"], ("follower",): single_flight.stats["coalesced"]}),
+        ("media_store_bytes", "gauge", "Bytes held in the media store", (), {(): media["bytes"]}),
+        ("media_store_entries", "gauge", "Content entries in the media store", (), {(): media["entries"]}),
+        ("speculation_total", "counter", "Speculative TEXT generations by outcome", ("outcome",),
+         {(k,): speculation_counts[k] for k in ("hits", "misses", "cancelled")}),
+        ("speculation_saved_seconds_total", "counter", "Latency saved by speculative TEXT hits", (),
+         {(): speculation_counts["saved_seconds"]}),
+        ("speculation_wasted_seconds_total", "counter", "Upstream time spent on discarded speculative calls", (),
+         {(): speculation_counts["wasted_seconds"]}),
+        ("upstream_concurrency_limit", "gauge", "Adaptive concurrency limit by model", ("model",),
+         {(m,): lane.concurrency.limit for m, lane in upstream.lanes.items()}),
+        ("upstream_retries_total", "counter", "Upstream calls retried by the scheduler", ("model",),
+         {(m,): lane.stats["retries"] for m, lane in upstream.lanes.items()}),
+        ("upstream_rate_limited_total", "counter", "429 responses seen by the scheduler", ("model",),
+         {(m,): lane.stats["rate_limited"] for m, lane in upstream.lanes.items()}),
+        ("translation_batches_total", "counter", "Upstream calls made by the translation batcher", (),
+         {(): translation_batcher.stats["batches"]}),
+        ("translation_batched_items_total", "counter", "Translations sent through the batcher", (),
+         {(): translation_batcher.stats["items"]}),
+        ("jobs", "gauge", "Jobs by intent and status", ("intent", "status"),
+         {(i, st): n for i, by_status in job_queue.report().items() for st, n in by_status.items()}),
+    ]
+
+@app.get("/metrics")
+def export_metrics():
+    # Sync handler: rendering and the job count query run in the threadpool, off the event loop
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     print("Starting server on http://localhost:8000")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,64 @@
+"""Throughput of /process against the local stub upstream.
+
+Starts stub_upstream.py on a local port, points the OpenAI client at it and
+drives the API in-process with an increasing number of concurrent clients.
+With the async upstream path, requests/sec should grow with the client count
+until the per-handler limits are reached.
+
+    python bench_async_upstream.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Run in a scratch directory so generated media doesn't land in ./static
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="bench_"))
+os.environ["JOB_DB_PATH"] = "jobs.db"  # in the scratch directory, not next to the module
+os.environ["SHARED_CACHE_PATH"] = ""  # off: cached intents would carry over from run to run
+
+STUB_PORT = 8900
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+
+import httpx
+from stub_upstream import start_stub
+from FastMultiModalApi import app
+
+PROMPTS = [
+    "Tell me a story about a robot learning to paint",
+    "Translate to Marathi: How are you today?",
+    "Read this message: Welcome to our AI service",
+]
+REQUESTS_PER_CLIENT = 10
+
+
+async def run_client(http, n):
+    for i in range(n):
+        response = await http.post("/process", json={"prompt": PROMPTS[i % len(PROMPTS)]})
+        response.raise_for_status()
+
+
+async def run_level(clients):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=120) as http:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(http, REQUESTS_PER_CLIENT) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+    return clients * REQUESTS_PER_CLIENT / elapsed
+
+
+async def main():
+    # One event loop for every level: the API's pooled client and semaphores
+    # belong to the loop they were first used on.
+    print(f"{'clients':>8} {'req/s':>10}")
+    for clients in [1, 2, 4, 8, 16, 32]:
+        rps = await run_level(clients)
+        print(f"{clients:>8} {rps:>10.1f}")
+
+
+if __name__ == "__main__":
+    start_stub(STUB_PORT)
+    asyncio.run(main())
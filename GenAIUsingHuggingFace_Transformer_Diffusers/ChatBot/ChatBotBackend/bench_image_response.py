@@ -0,0 +1,81 @@
+"""Response size and memory per image request: inline base64 vs /media URL.
+
+The stub upstream runs in this process; each response mode is measured in
+its own child process so peak RSS numbers don't leak between modes.
+"peak alloc" is the Python heap high-water mark of a single request;
+"RSS growth" for url mode also includes the background WebP/thumbnail work.
+
+    python bench_image_response.py
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+STUB_PORT = 8901
+REQUESTS = 10
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(mode):
+    """Runs in the child process."""
+    sys.path.insert(0, HERE)
+    os.chdir(tempfile.mkdtemp(prefix="bench_"))
+    os.environ["JOB_DB_PATH"] = "jobs.db"  # in the scratch directory, not next to the module
+    os.environ["SHARED_CACHE_PATH"] = "shared_cache.db"
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+
+    from fastapi.testclient import TestClient
+    from FastMultiModalApi import app
+
+    with TestClient(app) as http:
+        payload = {"prompt": "Create an image of a futuristic city at night", "response_mode": mode}
+        http.post("/process", json=payload).raise_for_status()  # warm-up
+        baseline_rss = rss_mb()
+
+        tracemalloc.start()
+        sizes, peaks = [], []
+        for _ in range(REQUESTS):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            response = http.post("/process", json=payload)
+            response.raise_for_status()
+            peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            sizes.append(len(response.content))
+        tracemalloc.stop()
+        time.sleep(0.5)  # let background variant tasks finish before reporting
+
+    return {
+        "mode": mode,
+        "response_bytes": sum(sizes) / len(sizes),
+        "peak_alloc_mb": max(peaks) / 1024 / 1024,
+        "rss_growth_mb": rss_mb() - baseline_rss,
+    }
+
+
+def main():
+    from stub_upstream import start_stub, PNG_BYTES
+    start_stub(STUB_PORT)
+    print(f"Upstream image: {len(PNG_BYTES) / 1024:.0f} KB, {REQUESTS} requests per mode\n")
+    print(f"{'mode':>8} {'response KB':>12} {'peak alloc MB':>14} {'RSS growth MB':>14}")
+    for mode in ["inline", "url"]:
+        out = subprocess.run([sys.executable, __file__, mode], capture_output=True, text=True, check=True)
+        r = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"{r['mode']:>8} {r['response_bytes'] / 1024:>12.1f} "
+              f"{r['peak_alloc_mb']:>14.2f} {r['rss_growth_mb']:>14.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        print(json.dumps(measure(sys.argv[1])))
+    else:
+        main()
@@ -0,0 +1,92 @@
+"""Cross-worker cache hits with several uvicorn worker processes.
+
+Starts the stub upstream and `uvicorn --workers 4` in a scratch directory,
+sends a set of unique translation prompts, then sends them again on fresh
+connections (so they land on arbitrary workers) and fetches a generated
+image from every worker. With the shared cache the repeat round makes no
+upstream calls and every /media fetch succeeds. Exits non-zero otherwise.
+
+    python bench_shared_cache.py
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from stub_upstream import start_stub
+
+STUB_PORT = 8906
+API_PORT = 8907
+WORKERS = 4
+PROMPTS = 40
+
+
+def wait_for(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def post(prompt, **extra):
+    # A new connection per request, so requests spread over the workers
+    response = httpx.post(f"http://127.0.0.1:{API_PORT}/process", json={"prompt": prompt, **extra}, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    start_stub(STUB_PORT)
+    env = {**os.environ, "OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1",
+           "STUB_LATENCY": "0.05", "JOB_DB_PATH": "jobs.db",
+           "SHARED_CACHE_PATH": "shared_cache.db"}  # relative: in the scratch cwd
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "FastMultiModalApi:app", "--port", str(API_PORT),
+         "--workers", str(WORKERS), "--log-level", "warning",
+         "--app-dir", os.path.dirname(os.path.abspath(__file__))],
+        cwd=tempfile.mkdtemp(prefix="bench_"), env=env)
+    ok = True
+    try:
+        wait_for(f"http://127.0.0.1:{API_PORT}/health")
+        stub = httpx.Client(base_url=f"http://127.0.0.1:{STUB_PORT}")
+        prompts = [f"Translate to Marathi: shared cache sentence {i}" for i in range(PROMPTS)]
+
+        for prompt in prompts:
+            post(prompt)
+        first = stub.get("/stub/stats").json().get("chat", 0)
+        for prompt in prompts:
+            post(prompt)
+        repeat = stub.get("/stub/stats").json().get("chat", 0) - first
+        print(f"translations: first round {first} upstream calls, repeat round {repeat}")
+        ok &= repeat == 0
+
+        image_url = post("Create an image of a lighthouse", response_mode="url")["image_url"]
+        statuses = [httpx.get(f"http://127.0.0.1:{API_PORT}{image_url}").status_code for _ in range(WORKERS * 5)]
+        print(f"media fetches across workers: {statuses.count(200)}/{len(statuses)} ok")
+        ok &= statuses.count(200) == len(statuses)
+
+        time.sleep(1.1)  # let every worker flush its counters
+        stats = httpx.get(f"http://127.0.0.1:{API_PORT}/cache/shared/stats").json()
+        for namespace, s in stats.items():
+            print(f"{namespace:>9}: hits {s['hits']} (cross-worker {s['cross_worker_hits']}), "
+                  f"misses {s['misses']}, live workers {s['live_workers']}")
+        metrics = httpx.get(f"http://127.0.0.1:{API_PORT}/metrics").text
+        print("\n".join(line for line in metrics.splitlines() if line.startswith("shared_cache_hits_total")))
+    finally:
+        server.terminate()
+        server.wait()
+    print("OK" if ok else "FAIL")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,65 @@
+"""Fire 50 identical concurrent prompts and check the upstream saw one call.
+
+Runs the API in-process against stub_upstream.py. Exits non-zero if any
+request fails or the stub received more than one generation call.
+
+    python bench_single_flight.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Run in a scratch directory so generated media doesn't land in ./static
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="bench_"))
+os.environ["JOB_DB_PATH"] = "jobs.db"  # in the scratch directory, not next to the module
+os.environ["SHARED_CACHE_PATH"] = "shared_cache.db"
+
+STUB_PORT = 8902
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+
+import httpx
+from stub_upstream import start_stub
+from FastMultiModalApi import app
+
+CLIENTS = 50
+CASES = [
+    ("IMAGE", "Create an image of a futuristic city at night", "image"),
+    ("TRANSLATION", "Translate to Marathi: How are you today?", "chat"),
+]
+
+
+async def fire(http, prompt):
+    responses = await asyncio.gather(*(
+        http.post("/process", json={"prompt": prompt, "response_mode": "url"}) for _ in range(CLIENTS)
+    ))
+    return [r.status_code for r in responses]
+
+
+async def main():
+    ok = True
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=120) as http, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{STUB_PORT}") as stub:
+        for intent, prompt, counter in CASES:
+            await stub.post("/stub/reset")
+            start = time.perf_counter()
+            statuses = await fire(http, prompt)
+            elapsed = time.perf_counter() - start
+            upstream_calls = (await stub.get("/stub/stats")).json().get(counter, 0)
+
+            passed = statuses == [200] * CLIENTS and upstream_calls == 1
+            ok &= passed
+            print(f"{intent:>12}: {CLIENTS} requests in {elapsed:.2f}s, "
+                  f"upstream '{counter}' calls = {upstream_calls} -> {'OK' if passed else 'FAIL'}")
+
+        print("coalescing stats:", (await http.get("/coalesce/stats")).json())
+    return ok
+
+
+if __name__ == "__main__":
+    start_stub(STUB_PORT)
+    sys.exit(0 if asyncio.run(main()) else 1)
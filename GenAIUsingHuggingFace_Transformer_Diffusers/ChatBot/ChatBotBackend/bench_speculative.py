@@ -0,0 +1,74 @@
+"""Latency and upstream cost of speculative TEXT generation.
+
+Runs the API in-process against stub_upstream.py with the local classifier
+disabled (threshold above 1), so every prompt needs the LLM intent call.
+The same 80% TEXT / 20% other mix is sent sequentially with speculation
+off and on, and the stub's chat call count shows the extra upstream cost.
+
+    python bench_speculative.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Run in a scratch directory so generated media doesn't land in ./static
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="bench_"))
+os.environ["JOB_DB_PATH"] = "jobs.db"  # in the scratch directory, not next to the module
+os.environ["SHARED_CACHE_PATH"] = ""  # off: cached intents would carry over from run to run
+
+STUB_PORT = 8903
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+os.environ["INTENT_CONFIDENCE_THRESHOLD"] = "1.01"
+os.environ["CACHE_INTENTS"] = ""
+
+import httpx
+from stub_upstream import start_stub
+import FastMultiModalApi as api
+
+REQUESTS = 50
+
+
+def prompt_for(i):
+    # Every fifth prompt is a translation; the rest are TEXT. Unique so nothing is cached.
+    if i % 5 == 4:
+        return f"Translate to Marathi: sentence number {i}"
+    return f"Tell me a fact about the number {i}"
+
+
+async def run(http, stub, speculative):
+    api.SPECULATIVE_TEXT = speculative
+    await stub.post("/stub/reset")
+    latencies = []
+    for i in range(REQUESTS):
+        start = time.perf_counter()
+        response = await http.post("/process", json={"prompt": prompt_for(i)})
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    chat_calls = (await stub.get("/stub/stats")).json().get("chat", 0)
+    return sum(latencies) / len(latencies), chat_calls
+
+
+async def main():
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=120) as http, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{STUB_PORT}") as stub:
+        print(f"{'mode':>12} {'avg ms':>8} {'upstream chat calls':>20}")
+        baseline, baseline_calls = await run(http, stub, speculative=False)
+        print(f"{'sequential':>12} {baseline * 1000:>8.1f} {baseline_calls:>20}")
+        latency, calls = await run(http, stub, speculative=True)
+        print(f"{'speculative':>12} {latency * 1000:>8.1f} {calls:>20}")
+
+        print(f"\nlatency saved: {(baseline - latency) * 1000:.1f} ms/request "
+              f"({(1 - latency / baseline) * 100:.0f}%)")
+        print(f"extra upstream calls: {calls - baseline_calls} "
+              f"({(calls - baseline_calls) / REQUESTS:.2f} per request)")
+        print("speculation stats:", (await http.get("/speculation/stats")).json())
+
+
+if __name__ == "__main__":
+    start_stub(STUB_PORT)
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""Translation throughput with and without micro-batching.
+
+Runs the API in-process against stub_upstream.py. Concurrent clients send
+unique translation prompts (so the cache and request coalescing don't
+help); each batching window is compared on requests/sec and on how many
+upstream calls were made. The upstream scheduler is turned off so the
+numbers show batching alone, not the default quota.
+
+    python bench_translation_batch.py
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Run in a scratch directory so generated media doesn't land in ./static
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.chdir(tempfile.mkdtemp(prefix="bench_"))
+os.environ["JOB_DB_PATH"] = "jobs.db"  # in the scratch directory, not next to the module
+os.environ["SHARED_CACHE_PATH"] = "shared_cache.db"
+
+STUB_PORT = 8905
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{STUB_PORT}/v1"
+os.environ["UPSTREAM_SCHEDULER"] = "0"
+os.environ["CACHE_INTENTS"] = ""
+
+import httpx
+from stub_upstream import start_stub
+import FastMultiModalApi as api
+
+CLIENTS = 32
+REQUESTS_PER_CLIENT = 10
+WINDOWS_MS = [0, 2, 5, 10]
+run_id = 0
+
+
+async def run_client(http, client_id):
+    for i in range(REQUESTS_PER_CLIENT):
+        prompt = f"Translate to Marathi: run {run_id} client {client_id} sentence {i}"
+        response = await http.post("/process", json={"prompt": prompt})
+        response.raise_for_status()
+        assert response.json()["result"].startswith("[mr] ")
+
+
+async def main():
+    global run_id
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=120) as http, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{STUB_PORT}") as stub:
+        print(f"{CLIENTS} clients x {REQUESTS_PER_CLIENT} translations, max batch {api.translation_batcher.max_size}\n")
+        print(f"{'window ms':>10} {'req/s':>8} {'upstream calls':>15} {'req per call':>13}")
+        for window_ms in WINDOWS_MS:
+            run_id += 1
+            api.translation_batcher.window = window_ms / 1000
+            await stub.post("/stub/reset")
+            start = time.perf_counter()
+            await asyncio.gather(*(run_client(http, c) for c in range(CLIENTS)))
+            elapsed = time.perf_counter() - start
+            calls = (await stub.get("/stub/stats")).json().get("chat", 0)
+            total = CLIENTS * REQUESTS_PER_CLIENT
+            print(f"{window_ms:>10} {total / elapsed:>8.1f} {calls:>15} {total / calls:>13.1f}")
+
+
+if __name__ == "__main__":
+    start_stub(STUB_PORT)
+    asyncio.run(main())
@@ -0,0 +1,88 @@
+"""Throughput of /process against a rate-limited stub upstream.
+
+The stub allows STUB_RPM requests per minute per model, enforced over
+one-second windows, and answers 429 above it. The same burst of TEXT prompts is sent three times, each in a
+fresh process:
+
+  client retries  - scheduler off, the OpenAI client's built-in retries (the old behaviour)
+  quota known     - scheduler with the stub's quota configured
+  AIMD only       - scheduler with no quota configured, adapting from 429s alone
+
+    python bench_upstream_quota.py
+"""
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+STUB_PORT = 8904
+STUB_RPM = 3000
+CLIENTS = 100
+REQUESTS_PER_CLIENT = 5
+
+MODES = {
+    "client retries": {"UPSTREAM_SCHEDULER": "0"},
+    "quota known": {"UPSTREAM_SCHEDULER": "1", "UPSTREAM_BURST_FRACTION": str(1 / 60),
+                    "UPSTREAM_QUOTAS": json.dumps({"gpt-4o-mini": {"rpm": STUB_RPM, "tpm": 0}})},
+    "AIMD only": {"UPSTREAM_SCHEDULER": "1",
+                  "UPSTREAM_QUOTAS": json.dumps({"gpt-4o-mini": {"rpm": 0, "tpm": 0}})},
+}
+
+
+async def run_client(http, client_id, outcomes):
+    for i in range(REQUESTS_PER_CLIENT):
+        # Unique prompts, so neither the cache nor request coalescing hides any calls
+        prompt = f"Tell me a short story about robot number {client_id * 100 + i}"
+        start = time.perf_counter()
+        response = await http.post("/process", json={"prompt": prompt})
+        outcomes.append((response.status_code, time.perf_counter() - start))
+
+
+async def measure():
+    import httpx
+    from stub_upstream import start_stub
+    from FastMultiModalApi import app
+
+    start_stub(STUB_PORT)
+    outcomes = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api", timeout=300) as http, \
+            httpx.AsyncClient(base_url=f"http://127.0.0.1:{STUB_PORT}") as stub:
+        start = time.perf_counter()
+        await asyncio.gather(*(run_client(http, c, outcomes) for c in range(CLIENTS)))
+        elapsed = time.perf_counter() - start
+        stub_calls = (await stub.get("/stub/stats")).json()
+
+    latencies = sorted(latency for status, latency in outcomes if status == 200)
+    ok = len(latencies)
+    p95 = latencies[int(ok * 0.95) - 1] if ok else 0.0
+    print(json.dumps({"ok": ok, "failed": len(outcomes) - ok, "elapsed": elapsed, "p95": p95,
+                      "rate_limited": stub_calls.get("rate_limited", 0)}))
+
+
+def main():
+    print(f"stub quota {STUB_RPM} rpm ({STUB_RPM / 60:.0f} req/s), "
+          f"{CLIENTS} clients x {REQUESTS_PER_CLIENT} requests\n")
+    print(f"{'mode':>15} {'ok':>5} {'failed':>7} {'429s':>6} {'seconds':>8} {'ok req/s':>9} {'p95 s':>6}")
+    for mode, env in MODES.items():
+        child_env = {**os.environ, **env, "STUB_RPM": str(STUB_RPM), "STUB_BURST_SECONDS": "1", "STUB_LATENCY": "0.2",
+                     "STUB_CAPACITY": "16", "OPENAI_API_KEY": "stub", "JOB_DB_PATH": "jobs.db",
+                     "SHARED_CACHE_PATH": "shared_cache.db",
+                     "OPENAI_BASE_URL": f"http://127.0.0.1:{STUB_PORT}/v1"}
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child"], env=child_env,
+                                cwd=tempfile.mkdtemp(prefix="bench_"),
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>15} {result['ok']:>5} {result['failed']:>7} {result['rate_limited']:>6} "
+              f"{result['elapsed']:>8.1f} {result['ok'] / result['elapsed']:>9.1f} {result['p95']:>6.2f}")
+
+
+if __name__ == "__main__":
+    if "--child" in sys.argv:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        asyncio.run(measure())
+    else:
+        main()
@@ -0,0 +1,84 @@
+"""Local intent classifier used ahead of the LLM intent call.
+
+The artifact is the TF-IDF + LogisticRegression pipeline written by
+train_intent_classifier.py. Calling sklearn for a single prompt costs about
+a millisecond of input validation, so at load time the fitted weights are
+copied into plain lookups and scored directly. Batches still go through
+sklearn, where that overhead is paid once for the whole list.
+"""
+from collections import Counter
+from pathlib import Path
+import math
+import os
+import joblib
+import numpy as np
+
+MODEL_PATH = Path(os.getenv("INTENT_MODEL_PATH", Path(__file__).with_name("intent_classifier.joblib")))
+CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.6"))
+
+
+class IntentClassifier:
+    def __init__(self, path=MODEL_PATH, threshold=CONFIDENCE_THRESHOLD):
+        self.threshold = threshold
+        self.stats = {"local": 0, "fallback": 0}
+        self.loaded = False
+        try:
+            pipeline = joblib.load(path)
+        except FileNotFoundError:
+            print(f"Intent model '{path}' not found, every prompt will use the LLM.")
+            print("Run train_intent_classifier.py to build it.")
+            return
+
+        self.pipeline = pipeline
+        vectorizer, model = pipeline[0], pipeline[-1]
+        self.analyzer = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = vectorizer.idf_
+        self.sublinear_tf = vectorizer.sublinear_tf
+        self.coef = model.coef_
+        self.intercept = model.intercept_
+        self.classes = list(model.classes_)
+        self.loaded = True
+
+    def predict(self, prompt):
+        """Return (intent, confidence); (None, 0.0) when no model is loaded."""
+        if not self.loaded:
+            return None, 0.0
+
+        counts = Counter(t for t in self.analyzer(prompt) if t in self.vocabulary)
+        scores = self.intercept
+        if counts:
+            idx = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.intp, count=len(counts))
+            tf = np.fromiter(
+                ((1 + math.log(c)) if self.sublinear_tf else c for c in counts.values()),
+                dtype=np.float64, count=len(counts),
+            )
+            weights = tf * self.idf[idx]
+            weights /= np.sqrt(weights @ weights)
+            scores = scores + self.coef[:, idx] @ weights
+
+        # Softmax over the class scores (multinomial logistic regression)
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return self.classes[best], float(probs[best])
+
+    def predict_many(self, prompts):
+        """Classify a batch in one vectorized sklearn call; [(intent, confidence), ...]."""
+        if not self.loaded:
+            return [(None, 0.0)] * len(prompts)
+        probs = self.pipeline.predict_proba(prompts)
+        best = probs.argmax(axis=1)
+        return [(self.classes[b], float(row[b])) for b, row in zip(best, probs)]
+
+    def record(self, used_fallback):
+        self.stats["fallback" if used_fallback else "local"] += 1
+
+    def report(self):
+        total = self.stats["local"] + self.stats["fallback"]
+        return {
+            "model_loaded": self.loaded,
+            "threshold": self.threshold,
+            **self.stats,
+            "fallback_rate": self.stats["fallback"] / total if total else 0.0,
+        }
@@ -0,0 +1,141 @@
+"""SQLite-backed job queue for long-running generation requests.
+
+Jobs survive restarts. A worker claims a job by leasing it for a
+visibility timeout and keeps the lease alive with heartbeats while it
+works. If the worker dies, the lease runs out and another worker picks
+the job up again, until it has been attempted `max_attempts` times.
+Claims run inside BEGIN IMMEDIATE transactions, so several uvicorn
+workers can share one queue file.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.db"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_DELAY = float(os.getenv("JOB_RETRY_DELAY", "5"))
+
+TERMINAL = ("done", "failed")
+
+
+class JobQueue:
+    def __init__(self, db_path=JOB_DB_PATH, max_attempts=JOB_MAX_ATTEMPTS, retry_delay=JOB_RETRY_DELAY):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                intent TEXT NOT NULL,
+                prompt TEXT NOT NULL,
+                response_mode TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                claimed_by TEXT,
+                visible_at REAL NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (intent, status, visible_at)")
+
+    def enqueue(self, intent, prompt, response_mode):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO jobs (id, intent, prompt, response_mode, status, visible_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, intent, prompt, response_mode, now, now, now))
+        return job_id
+
+    def claim(self, intent, worker_id, lease):
+        """Lease the oldest ready job for `intent`, or return None.
+
+        Ready means queued, or running with an expired lease (its worker died).
+        """
+        now = time.time()
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs whose worker died on the last allowed attempt are given up on
+                self.db.execute(
+                    "UPDATE jobs SET status = 'failed', error = 'Worker lost on final attempt', updated_at = ? "
+                    "WHERE intent = ? AND status = 'running' AND visible_at <= ? AND attempts >= ?",
+                    (now, intent, now, self.max_attempts))
+                row = self.db.execute(
+                    "SELECT id FROM jobs WHERE intent = ? AND status IN ('queued', 'running') AND visible_at <= ? "
+                    "ORDER BY created_at LIMIT 1",
+                    (intent, now)).fetchone()
+                if row is None:
+                    self.db.execute("COMMIT")
+                    return None
+                self.db.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, claimed_by = ?, "
+                    "visible_at = ?, updated_at = ? WHERE id = ?",
+                    (worker_id, now + lease, now, row["id"]))
+                job = self.db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+                self.db.execute("COMMIT")
+            except Exception:
+                self.db.execute("ROLLBACK")
+                raise
+        return dict(job)
+
+    def heartbeat(self, job_id, worker_id, lease):
+        """Extend a lease; False if the job is no longer ours."""
+        now = time.time()
+        with self.lock:
+            cursor = self.db.execute(
+                "UPDATE jobs SET visible_at = ?, updated_at = ? WHERE id = ? AND claimed_by = ? AND status = 'running'",
+                (now + lease, now, job_id, worker_id))
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result):
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET status = 'done', result = ?, error = NULL, updated_at = ? "
+                "WHERE id = ? AND claimed_by = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id, worker_id))
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt: requeue after a delay, or give up after max_attempts."""
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "UPDATE jobs SET "
+                "status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END, "
+                "visible_at = ?, error = ?, updated_at = ? WHERE id = ? AND claimed_by = ?",
+                (self.max_attempts, now + self.retry_delay, error, now, job_id, worker_id))
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        return {
+            "job_id": job["id"],
+            "intent": job["intent"],
+            "status": job["status"],
+            "attempts": job["attempts"],
+            "result": json.loads(job["result"]) if job["result"] else None,
+            "error": job["error"],
+            "created_at": job["created_at"],
+            "updated_at": job["updated_at"],
+        }
+
+    def report(self):
+        with self.lock:
+            rows = self.db.execute("SELECT intent, status, COUNT(*) FROM jobs GROUP BY intent, status").fetchall()
+        counts = {}
+        for intent, status, count in rows:
+            counts.setdefault(intent, {})[status] = count
+        return counts
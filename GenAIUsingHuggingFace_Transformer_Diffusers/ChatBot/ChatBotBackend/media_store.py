@@ -0,0 +1,211 @@
+"""Content-addressed, size-capped storage for generated images and audio.
+
+Files are named by the SHA-256 of their bytes, so identical outputs are
+stored once and a name never changes meaning (which is what makes the
+immutable cache headers safe). Derived files such as WebP variants and
+thumbnails are attached to their source and evicted with it. A janitor
+task keeps the total size under MEDIA_MAX_BYTES, evicting least recently
+used entries first.
+
+With several worker processes each one keeps its own index; names are
+published to an optional SharedCache so a file written by one worker is
+found (and served) by the others, and a file another worker evicted is
+dropped from the index instead of being served as missing.
+"""
+from collections import OrderedDict
+from pathlib import Path
+import asyncio
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+MEDIA_ROOT = os.getenv("MEDIA_ROOT", "static/media")
+MEDIA_MAX_BYTES = int(os.getenv("MEDIA_MAX_BYTES", str(2 * 1024 ** 3)))
+MEDIA_JANITOR_INTERVAL = float(os.getenv("MEDIA_JANITOR_INTERVAL", "60"))
+# Evict down to this fraction of the cap so the janitor isn't evicting on every pass
+MEDIA_LOW_WATER = 0.9
+
+DIGEST_CHARS = 32
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class MediaStore:
+    def __init__(self, root=MEDIA_ROOT, max_bytes=MEDIA_MAX_BYTES, janitor_interval=MEDIA_JANITOR_INTERVAL,
+                 shared=None):
+        self.root = Path(root)
+        self.tmp = self.root / "tmp"
+        self.tmp.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.janitor_interval = janitor_interval
+        self.shared = shared
+        self.entries = OrderedDict()  # digest -> {"files": {name: size}, "bytes": int}, LRU order
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.janitor = None
+        self.stats = {"puts": 0, "dedup_hits": 0, "evictions": 0, "evicted_bytes": 0,
+                      "shared_lookups": 0, "shared_hits": 0}
+        self._load()
+
+    def _load(self):
+        # Rebuild the index from disk, oldest access first
+        files = sorted((p for p in self.root.iterdir() if p.is_file()), key=lambda p: p.stat().st_mtime)
+        for path in files:
+            self._add(path.name.split(".")[0].split("_")[0], path.name, path.stat().st_size)
+        for stale in self.tmp.iterdir():
+            stale.unlink(missing_ok=True)
+
+    def _add(self, digest, name, size):
+        entry = self.entries.setdefault(digest, {"files": {}, "bytes": 0})
+        self.entries.move_to_end(digest)
+        if name not in entry["files"]:
+            entry["files"][name] = size
+            entry["bytes"] += size
+            self.bytes += size
+
+    def _forget(self, digest, name):
+        entry = self.entries.get(digest)
+        if entry is None or name not in entry["files"]:
+            return
+        size = entry["files"].pop(name)
+        entry["bytes"] -= size
+        self.bytes -= size
+        if not entry["files"]:
+            del self.entries[digest]
+
+    def _publish(self, name, size):
+        if self.shared is not None:
+            self.shared.set("media", name, {"size": size})
+
+    # ---- Writing ---- #
+
+    def temp_path(self, suffix):
+        """A scratch path on the same filesystem, for streaming a download before it is hashed."""
+        return self.tmp / f"{uuid.uuid4().hex}{suffix}"
+
+    def put_file(self, tmp_path, suffix):
+        """Move a finished temp file into the store; returns its content-addressed name."""
+        sha = hashlib.sha256()
+        with open(tmp_path, "rb") as f:
+            while chunk := f.read(HASH_CHUNK_SIZE):
+                sha.update(chunk)
+        digest = sha.hexdigest()[:DIGEST_CHARS]
+        name = f"{digest}{suffix}"
+        path = self.root / name
+
+        with self.lock:
+            self.stats["puts"] += 1
+            if path.exists():
+                self.stats["dedup_hits"] += 1
+                os.remove(tmp_path)
+                os.utime(path)
+                # May have been written by another worker, so not in our index yet
+                self._add(digest, name, path.stat().st_size)
+                return name
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+            self._add(digest, name, size)
+        self._publish(name, size)
+        return name
+
+    def put_bytes(self, data, suffix):
+        tmp_path = self.temp_path(suffix)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        return self.put_file(tmp_path, suffix)
+
+    def attach(self, name, derived_name, tmp_path):
+        """Store a file derived from `name` (e.g. a thumbnail) so it shares its lifetime."""
+        digest = name.split(".")[0]
+        path = self.root / derived_name
+        os.replace(tmp_path, path)
+        size = path.stat().st_size
+        with self.lock:
+            self._add(digest, derived_name, size)
+        self._publish(derived_name, size)
+
+    # ---- Reading ---- #
+
+    def path(self, name):
+        return self.root / Path(name).name
+
+    def open(self, name):
+        """Path of a stored file, marking it recently used; None if missing."""
+        path = self.path(name)
+        digest = path.name.split(".")[0].split("_")[0]
+        with self.lock:
+            if digest in self.entries and path.name in self.entries[digest]["files"]:
+                if path.is_file():
+                    self.entries.move_to_end(digest)
+                    return path
+                self._forget(digest, path.name)  # evicted by another worker
+                return None
+        if self.shared is None:
+            return None
+
+        # Not in our index: another worker may have stored it
+        meta = self.shared.get("media", path.name)
+        with self.lock:
+            self.stats["shared_lookups"] += 1
+            if meta is None or not path.is_file():
+                return None
+            self.stats["shared_hits"] += 1
+            self._add(digest, path.name, meta["size"])
+        return path
+
+    # ---- Eviction ---- #
+
+    def evict(self):
+        """Drop least recently used entries until the store is under its low-water mark."""
+        removed = []
+        with self.lock:
+            if self.bytes <= self.max_bytes:
+                return 0
+            target = self.max_bytes * MEDIA_LOW_WATER
+            while self.entries and self.bytes > target:
+                digest, entry = self.entries.popitem(last=False)
+                self.bytes -= entry["bytes"]
+                self.stats["evictions"] += 1
+                self.stats["evicted_bytes"] += entry["bytes"]
+                removed.extend(entry["files"])
+        for name in removed:
+            (self.root / name).unlink(missing_ok=True)
+        if self.shared is not None and removed:
+            self.shared.delete("media", removed)
+        return len(removed)
+
+    async def run_janitor(self):
+        while True:
+            await asyncio.sleep(self.janitor_interval)
+            try:
+                await asyncio.to_thread(self.evict)
+                if self.shared is not None:
+                    # The shared cache has no janitor of its own; expired rows go here
+                    await asyncio.to_thread(self.shared.purge_expired)
+            except Exception as e:
+                print(f"Media janitor failed: {e}")
+
+    def start_janitor(self):
+        self.janitor = asyncio.create_task(self.run_janitor())
+
+    def stop_janitor(self):
+        if self.janitor is not None:
+            self.janitor.cancel()
+
+    def report(self):
+        with self.lock:
+            return {
+                **self.stats,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "usage": self.bytes / self.max_bytes if self.max_bytes else 0.0,
+            }
+
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
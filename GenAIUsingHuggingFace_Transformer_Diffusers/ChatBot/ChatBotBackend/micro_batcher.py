@@ -0,0 +1,68 @@
+"""Collect concurrent calls for a few milliseconds and run them as one batch.
+
+submit(item) waits until the window closes (or the batch is full), then
+the batch function is called once with every item collected and must
+return one result per item, in order. An exception from the batch
+function is raised to every caller in that batch; if the batch is
+cancelled, its callers are cancelled too.
+"""
+import asyncio
+
+
+class MicroBatcher:
+    def __init__(self, func, window, max_size):
+        self.func = func
+        self.window = window
+        self.max_size = max_size
+        self.pending = []  # (item, future)
+        self.timer = None
+        self.tasks = set()
+        self.stats = {"items": 0, "batches": 0, "largest_batch": 0}
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((item, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self.run(batch))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+
+    async def run(self, batch):
+        self.stats["items"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+        try:
+            results = await self.func([item for item, _ in batch])
+            for (_, future), result in zip(batch, results):
+                if not future.done():  # the caller may have gone away
+                    future.set_result(result)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            # Cancelled (e.g. at shutdown) or short of results: don't leave a caller waiting forever
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    def report(self):
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "window_ms": self.window * 1000,
+            "max_size": self.max_size,
+            "avg_batch": self.stats["items"] / batches if batches else 0.0,
+        }
@@ -0,0 +1,138 @@
+"""Response cache for the text and translation handlers.
+
+Two tiers: an in-memory LRU bounded by entry count and bytes, and an
+optional SharedCache that survives restarts and is shared by every
+worker process. Both honour the same TTL.
+Keys cover everything that changes the answer: the normalized prompt,
+the intent, the model and its sampling parameters.
+"""
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "3600"))
+# Translation is deterministic enough to cache by default; add TEXT to opt in
+CACHE_INTENTS = os.getenv("CACHE_INTENTS", "TRANSLATION")
+
+
+def normalize_prompt(prompt):
+    return " ".join(prompt.split()).casefold()
+
+
+class ResponseCache:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 ttl=CACHE_TTL_SECONDS, shared=None, intents=CACHE_INTENTS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.intents = {i.strip().upper() for i in intents.split(",") if i.strip()}
+        self.entries = OrderedDict()  # key -> (expires_at, size, value)
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "shared_hits": 0, "misses": 0,
+                      "evictions": 0, "expirations": 0}
+        self.shared = shared
+
+    def key_for(self, intent, prompt, params):
+        """Cache key for a request, or None when the intent isn't cacheable."""
+        if intent not in self.intents:
+            return None
+        raw = json.dumps([normalize_prompt(prompt), intent, params], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        value = self._get_memory(key)
+        if value is None and self.shared is not None:
+            value = self._get_shared(key)
+        if value is None:
+            self._miss()
+        return value
+
+    async def get_async(self, key):
+        """get() for the event loop: a memory hit returns inline, the SQLite lookup runs in a thread."""
+        value = self._get_memory(key)
+        if value is None and self.shared is not None:
+            value = await asyncio.to_thread(self._get_shared, key)
+        if value is None:
+            self._miss()
+        return value
+
+    def _get_memory(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self.entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return entry[2]
+                self._drop(key)
+                self.stats["expirations"] += 1
+        return None
+
+    def _get_shared(self, key):
+        # Outside our lock: the shared tier has its own, and may wait on other workers
+        stored = self.shared.get("response", key)
+        if stored is None:
+            return None
+        with self.lock:
+            self._store(key, stored["value"], stored["expires_at"], len(json.dumps(stored["value"])))
+            self.stats["shared_hits"] += 1
+        return stored["value"]
+
+    def _miss(self):
+        with self.lock:
+            self.stats["misses"] += 1
+
+    def set(self, key, value):
+        expires_at = self._set_memory(key, value)
+        if self.shared is not None:
+            self.shared.set("response", key, {"value": value, "expires_at": expires_at}, ttl=self.ttl)
+
+    async def set_async(self, key, value):
+        """set() for the event loop: the SQLite write runs in a thread."""
+        expires_at = self._set_memory(key, value)
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.set, "response", key,
+                                    {"value": value, "expires_at": expires_at}, ttl=self.ttl)
+
+    def _set_memory(self, key, value):
+        expires_at = time.time() + self.ttl
+        raw = json.dumps(value)
+        with self.lock:
+            self._store(key, value, expires_at, len(raw))
+        return expires_at
+
+    def _store(self, key, value, expires_at, size):
+        if key in self.entries:
+            self._drop(key)
+        self.entries[key] = (expires_at, size, value)
+        self.bytes += size
+        while self.entries and (len(self.entries) > self.max_entries or self.bytes > self.max_bytes):
+            self._drop(next(iter(self.entries)))
+            self.stats["evictions"] += 1
+
+    def _drop(self, key):
+        self.bytes -= self.entries.pop(key)[1]
+
+    def report(self):
+        with self.lock:
+            lookups = self.stats["memory_hits"] + self.stats["shared_hits"] + self.stats["misses"]
+            hits = lookups - self.stats["misses"]
+            return {
+                **self.stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "cacheable_intents": sorted(self.intents),
+                "shared_enabled": self.shared is not None,
+            }
@@ -0,0 +1,172 @@
+"""Key-value cache shared by every worker process on the host.
+
+One SQLite file in WAL mode: readers never block each other or the
+writer, so all uvicorn workers can look up what any of them stored.
+Entries live in namespaces ("intent", "response", "media") and remember
+the pid that wrote them, which is how a hit is told apart as
+cross-worker. Each process writes its counters to a stats row about once
+a second, so report() from any worker shows totals for all of them.
+A worker's row is folded into a pid 0 row when it exits (or, after a
+crash, when the next worker starts), so totals survive restarts without
+the table growing. Expired entries are removed by purge_expired(), run
+from the media janitor.
+
+Every call may wait up to busy_timeout on another worker's write: from
+async code, run them with asyncio.to_thread.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+SHARED_CACHE_PATH = os.getenv(
+    "SHARED_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "shared_cache.db"))  # "" = disabled
+STATS_FLUSH_INTERVAL = 1.0
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # exists, owned by someone else
+    return True
+
+
+class SharedCache:
+    def __init__(self, db_path=SHARED_CACHE_PATH):
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")  # a crash may lose the last writes, never corrupt
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                writer INTEGER NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )""")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS stats (
+                pid INTEGER NOT NULL,
+                namespace TEXT NOT NULL,
+                hits INTEGER NOT NULL,
+                cross_worker_hits INTEGER NOT NULL,
+                misses INTEGER NOT NULL,
+                sets INTEGER NOT NULL,
+                PRIMARY KEY (pid, namespace)
+            )""")
+        self.purge_expired()
+        self._fold_stats([pid for (pid,) in self.db.execute("SELECT DISTINCT pid FROM stats WHERE pid != 0")
+                          if not pid_alive(pid)])
+        self.stats = {}
+        self.last_flush = 0.0
+
+    def get(self, namespace, key):
+        now = time.time()
+        with self.lock:
+            row = self.db.execute(
+                "SELECT value, expires_at, writer FROM entries WHERE namespace = ? AND key = ?",
+                (namespace, key)).fetchone()
+            stats = self._stats(namespace)
+            if row is None or (row[1] is not None and row[1] <= now):
+                stats["misses"] += 1
+                self._maybe_flush(now)
+                return None
+            stats["hits"] += 1
+            if row[2] != os.getpid():
+                stats["cross_worker_hits"] += 1
+            self._maybe_flush(now)
+        return json.loads(row[0])
+
+    def set(self, namespace, key, value, ttl=None):
+        now = time.time()
+        raw = json.dumps(value, ensure_ascii=False)
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, raw, now + ttl if ttl else None, os.getpid()))
+            self._stats(namespace)["sets"] += 1
+            self._maybe_flush(now)
+
+    def delete(self, namespace, keys):
+        with self.lock:
+            self.db.executemany("DELETE FROM entries WHERE namespace = ? AND key = ?",
+                                [(namespace, key) for key in keys])
+
+    def purge_expired(self):
+        with self.lock:
+            return self.db.execute("DELETE FROM entries WHERE expires_at < ?", (time.time(),)).rowcount
+
+    def _fold_stats(self, pids):
+        # Add exited workers' counters to the pid 0 row and drop their own rows, in one transaction
+        if not pids:
+            return
+        marks = ",".join("?" * len(pids))
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute(f"""
+                    INSERT INTO stats
+                    SELECT 0, namespace, SUM(hits), SUM(cross_worker_hits), SUM(misses), SUM(sets)
+                    FROM stats WHERE pid IN ({marks}) GROUP BY namespace
+                    ON CONFLICT (pid, namespace) DO UPDATE SET
+                        hits = hits + excluded.hits,
+                        cross_worker_hits = cross_worker_hits + excluded.cross_worker_hits,
+                        misses = misses + excluded.misses,
+                        sets = sets + excluded.sets""", pids)
+                self.db.execute(f"DELETE FROM stats WHERE pid IN ({marks})", pids)
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+
+    def close(self):
+        """At worker exit: fold this worker's counters into the totals and close the connection."""
+        with self.lock:
+            self._maybe_flush(time.time(), force=True)
+        self._fold_stats([os.getpid()])
+        self.db.close()
+
+    def _stats(self, namespace):
+        stats = self.stats.get(namespace)
+        if stats is None:
+            stats = self.stats[namespace] = {"hits": 0, "cross_worker_hits": 0, "misses": 0, "sets": 0}
+        return stats
+
+    def _maybe_flush(self, now, force=False):
+        if not force and now - self.last_flush < STATS_FLUSH_INTERVAL:
+            return
+        self.last_flush = now
+        pid = os.getpid()
+        self.db.executemany(
+            "INSERT OR REPLACE INTO stats VALUES (?, ?, ?, ?, ?, ?)",
+            [(pid, ns, s["hits"], s["cross_worker_hits"], s["misses"], s["sets"]) for ns, s in self.stats.items()])
+
+    def report(self):
+        """Counters summed over every worker, by namespace."""
+        with self.lock:
+            self._maybe_flush(time.time(), force=True)
+            rows = self.db.execute(
+                "SELECT namespace, SUM(hits), SUM(cross_worker_hits), SUM(misses), SUM(sets), SUM(pid != 0) "
+                "FROM stats GROUP BY namespace").fetchall()
+            entries = dict(self.db.execute("SELECT namespace, COUNT(*) FROM entries GROUP BY namespace").fetchall())
+        report = {}
+        for namespace, hits, cross, misses, sets, workers in rows:
+            lookups = hits + misses
+            report[namespace] = {
+                "hits": hits,
+                "cross_worker_hits": cross,
+                "misses": misses,
+                "sets": sets,
+                "entries": entries.get(namespace, 0),
+                "live_workers": workers,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "cross_worker_hit_rate": cross / lookups if lookups else 0.0,
+            }
+        return report
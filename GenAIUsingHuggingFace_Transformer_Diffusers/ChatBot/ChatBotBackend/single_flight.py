@@ -0,0 +1,33 @@
+"""Coalesce identical concurrent calls into one in-flight upstream call.
+
+The first caller for a key starts the work as its own task; callers that
+arrive while it is running await the same task instead of starting
+another. The task is shielded, so a leader whose client disconnects
+doesn't cancel the call the followers are waiting on.
+"""
+import asyncio
+
+
+class SingleFlight:
+    def __init__(self):
+        self.in_flight = {}
+        self.stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key, func):
+        task = self.in_flight.get(key)
+        if task is None:
+            self.stats["leaders"] += 1
+            task = asyncio.create_task(func())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def report(self):
+        calls = self.stats["leaders"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "in_flight": len(self.in_flight),
+            "coalesced_rate": self.stats["coalesced"] / calls if calls else 0.0,
+        }
@@ -0,0 +1,219 @@
+"""Local stand-in for the OpenAI endpoints used by FastMultiModalApi.
+
+Only the benchmark scripts use this. Every endpoint sleeps for STUB_LATENCY
+seconds so the numbers show how well the API overlaps upstream waits, not
+how fast the CPU is.
+
+A quota can be simulated: STUB_RPM caps requests per minute per model
+(answering 429 above it) and STUB_CAPACITY is the number of concurrent
+calls per model after which latency grows with load.
+"""
+import asyncio
+import json
+import os
+import random
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+import uvicorn
+
+LATENCY = float(os.getenv("STUB_LATENCY", "0.2"))
+IMAGE_SIDE = int(os.getenv("STUB_IMAGE_SIDE", "1024"))
+RPM = int(os.getenv("STUB_RPM", "0"))  # 0 = unlimited
+BURST_SECONDS = float(os.getenv("STUB_BURST_SECONDS", "60"))  # a whole minute's quota, as OpenAI allows
+CAPACITY = int(os.getenv("STUB_CAPACITY", "0"))  # 0 = latency never degrades
+
+app = FastAPI()
+calls = Counter()
+
+
+# ---- Fake payloads ---- #
+
+def make_png(side: int) -> bytes:
+    """Build a valid RGB PNG filled with noise (compresses about as badly as a real photo)."""
+    rng = random.Random(42)
+    raw = b"".join(b"\x00" + rng.randbytes(side * 3) for _ in range(side))
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(raw, 1)) + chunk(b"IEND", b""))
+
+
+PNG_BYTES = make_png(IMAGE_SIDE)
+MP3_BYTES = random.Random(7).randbytes(64 * 1024)
+
+
+def classify(text: str) -> str:
+    norm = text.lower()
+    if any(k in norm for k in ["image", "draw", "picture", "photo"]):
+        return "IMAGE"
+    if any(k in norm for k in ["read", "speak", "audio", "say"]):
+        return "AUDIO"
+    if "translate" in norm:
+        return "TRANSLATION"
+    return "TEXT"
+
+
+def completion(model: str, content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 20, "completion_tokens": 40, "total_tokens": 60},
+    }
+
+
+async def completion_stream(model: str, content: str):
+    """Yield the reply word by word in the OpenAI SSE chunk format."""
+    def chunk(delta, finish_reason=None, usage=None):
+        choices = [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        body = {"id": "chatcmpl-stub", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model, "choices": choices, "usage": usage}
+        return f"data: {json.dumps(body)}\n\n"
+
+    yield chunk({"role": "assistant", "content": ""})
+    for i, word in enumerate(content.split(" ")):
+        await asyncio.sleep(LATENCY / 20)
+        yield chunk({"content": word if i == 0 else " " + word})
+    yield chunk({}, finish_reason="stop")
+    yield chunk({}, usage={"prompt_tokens": 20, "completion_tokens": 40, "total_tokens": 60})
+    yield "data: [DONE]\n\n"
+
+
+# ---- Simulated quota ---- #
+
+quota_tokens = {}
+quota_updated = {}
+in_flight = Counter()
+
+
+def over_quota(model: str) -> bool:
+    """Token bucket per model holding STUB_BURST_SECONDS of quota."""
+    if not RPM:
+        return False
+    rate = RPM / 60
+    capacity = max(1.0, rate * BURST_SECONDS)
+    now = time.monotonic()
+    tokens = min(capacity, quota_tokens.get(model, capacity) + (now - quota_updated.get(model, now)) * rate)
+    quota_updated[model] = now
+    if tokens < 1:
+        quota_tokens[model] = tokens
+        return True
+    quota_tokens[model] = tokens - 1
+    return False
+
+
+def rate_limited() -> Response:
+    calls["rate_limited"] += 1
+    body = {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}
+    return Response(json.dumps(body), status_code=429, media_type="application/json")
+
+
+async def upstream_wait(model: str):
+    """Sleep LATENCY, stretched once more than CAPACITY calls are in flight."""
+    in_flight[model] += 1
+    try:
+        load = in_flight[model] / CAPACITY if CAPACITY else 1
+        await asyncio.sleep(LATENCY * max(1, load))
+    finally:
+        in_flight[model] -= 1
+
+
+# ---- Endpoints ---- #
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if over_quota(body["model"]):
+        return rate_limited()
+    calls["chat"] += 1
+    system = body["messages"][0]["content"]
+    user = body["messages"][-1]["content"]
+    if system.startswith("Classify"):
+        content = classify(user)
+    elif body.get("response_format", {}).get("type") == "json_schema":
+        # Multi-segment translation: a JSON array in, {"translations": [...]} out
+        content = json.dumps({"translations": [f"[mr] {segment}" for segment in json.loads(user)]})
+    elif system.startswith("Translate"):
+        content = f"[mr] {user}"
+    else:
+        content = f"Stub answer to: {user}"
+
+    if body.get("stream"):
+        return StreamingResponse(completion_stream(body["model"], content), media_type="text/event-stream")
+    await upstream_wait(body["model"])
+    return completion(body["model"], content)
+
+
+@app.post("/v1/images/generations")
+async def images_generations(request: Request):
+    if over_quota("dall-e-3"):
+        return rate_limited()
+    calls["image"] += 1
+    await upstream_wait("dall-e-3")
+    return {"created": int(time.time()), "data": [{"url": f"{request.base_url}files/image.png"}]}
+
+
+@app.get("/files/image.png")
+async def image_file():
+    calls["download"] += 1
+    return Response(PNG_BYTES, media_type="image/png")
+
+
+@app.post("/v1/audio/speech")
+async def audio_speech():
+    if over_quota("tts-1"):
+        return rate_limited()
+    calls["speech"] += 1
+
+    async def chunks():
+        # Like real TTS: the first bytes arrive quickly, the rest over LATENCY seconds
+        step = len(MP3_BYTES) // 8
+        for i in range(0, len(MP3_BYTES), step):
+            yield MP3_BYTES[i:i + step]
+            await asyncio.sleep(LATENCY / 8)
+
+    return StreamingResponse(chunks(), media_type="audio/mpeg")
+
+
+@app.get("/stub/stats")
+def stats():
+    return dict(calls)
+
+
+@app.post("/stub/reset")
+def reset():
+    calls.clear()
+    quota_tokens.clear()
+    quota_updated.clear()
+    return {"reset": True}
+
+
+# ---- Runner ---- #
+
+def start_stub(port: int = 8900) -> uvicorn.Server:
+    """Run the stub in a background thread and return once it accepts connections."""
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8900)
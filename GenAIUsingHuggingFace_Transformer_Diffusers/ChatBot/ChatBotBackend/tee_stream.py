@@ -0,0 +1,54 @@
+"""Fan one upstream byte stream out to HTTP clients while saving it to disk.
+
+The upstream is consumed by its own task, so a client that disconnects
+early doesn't cut the recording short, and a client that connects while
+generation is still running (browsers often re-request media) replays the
+chunks received so far and then follows live.
+"""
+import asyncio
+import os
+
+
+class TeeStream:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.changed = asyncio.Condition()
+
+    async def pump(self, source):
+        """Drain an async byte iterator into memory readers and <filepath>.part, then rename."""
+        part = self.filepath + ".part"
+        try:
+            with open(part, "wb") as f:
+                async for chunk in source:
+                    async with self.changed:
+                        self.chunks.append(chunk)
+                        self.changed.notify_all()
+                    await asyncio.to_thread(f.write, chunk)
+            os.replace(part, self.filepath)
+        except Exception as e:
+            self.error = e
+            if os.path.exists(part):
+                os.remove(part)
+        finally:
+            async with self.changed:
+                self.done = True
+                self.changed.notify_all()
+
+    async def read(self):
+        """Yield every chunk from the start, waiting for new ones until the upstream ends."""
+        sent = 0
+        while True:
+            async with self.changed:
+                await self.changed.wait_for(lambda: sent < len(self.chunks) or self.done)
+                pending = self.chunks[sent:]
+                finished = self.done
+            for chunk in pending:
+                yield chunk
+            sent += len(pending)
+            if finished and sent >= len(self.chunks):
+                if self.error is not None:
+                    raise self.error
+                return
@@ -0,0 +1,65 @@
+import time
+import pandas as pd
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.model_selection import train_test_split
+from sklearn.metrics import accuracy_score, classification_report
+import joblib
+from intent_classifier import IntentClassifier
+
+THRESHOLD = 0.6
+
+# Load the labelled prompts
+df = pd.read_csv('intent_prompts.csv')
+X = df['prompt']
+Y = df['intent']
+
+# Split the data
+x_train, x_test, y_train, y_test = train_test_split(X, Y, test_size=0.25, stratify=Y, random_state=231231123)
+
+def build_model():
+    # Word uni/bi-grams carry the intent keywords ("draw", "read aloud", "in Marathi")
+    return make_pipeline(
+        TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True),
+        LogisticRegression(C=10, max_iter=2000)
+    )
+
+# Train and evaluate
+model = build_model()
+model.fit(x_train, y_train)
+
+y_pred = model.predict(x_test)
+confidence = model.predict_proba(x_test).max(axis=1)
+confident = confidence >= THRESHOLD
+
+print("---- Accuracy report ----")
+print(f"Test accuracy: {accuracy_score(y_test, y_pred):.3f}")
+print(classification_report(y_test, y_pred))
+print(f"Share above threshold {THRESHOLD}: {confident.mean():.1%} "
+      f"(the rest would fall back to the LLM)")
+if confident.any():
+    print(f"Accuracy above threshold: {accuracy_score(y_test[confident], y_pred[confident]):.3f}")
+
+# Retrain on all labelled prompts and save the artifact loaded by FastMultiModalApi
+model = build_model()
+model.fit(X, Y)
+joblib.dump(model, 'intent_classifier.joblib')
+
+print("Model saved successfully as 'intent_classifier.joblib'")
+
+# Single-prompt latency of the runtime classifier, which is what /process pays
+print("---- Latency report ----")
+classifier = IntentClassifier('intent_classifier.joblib', threshold=THRESHOLD)
+mismatches = sum(classifier.predict(p)[0] != label for p, label in zip(X, model.predict(X)))
+print(f"Runtime classifier disagrees with sklearn on {mismatches} of {len(X)} prompts")
+
+samples = list(X) * 10
+timings = []
+for prompt in samples:
+    start = time.perf_counter()
+    classifier.predict(prompt)
+    timings.append((time.perf_counter() - start) * 1e6)
+print(f"p50: {np.percentile(timings, 50):.0f} us, p99: {np.percentile(timings, 99):.0f} us "
+      f"over {len(timings)} calls")
@@ -0,0 +1,256 @@
+"""Per-model admission control for upstream API calls.
+
+Each model gets a request bucket and a token bucket sized from its quota
+(requests and tokens per minute), plus an adaptive concurrency limit:
+additive increase while calls succeed, multiplicative decrease on 429s or
+when recent latency climbs well above its long-run average. Failed
+calls that are worth retrying back off with full jitter until a deadline.
+The OpenAI client's own retries should be turned off (max_retries=0) so
+the two don't stack.
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+import random
+import time
+
+import openai
+
+UPSTREAM_SCHEDULER = os.getenv("UPSTREAM_SCHEDULER", "1") == "1"
+UPSTREAM_DEADLINE = float(os.getenv("UPSTREAM_DEADLINE", "60"))
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "6"))
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "64"))
+# Buckets hold this share of the per-minute quota, so a burst up to the quota passes
+# unthrottled (dall-e-3 at 7 rpm can start 7 images at once); lower it for upstreams
+# that enforce the quota over shorter windows
+UPSTREAM_BURST_FRACTION = float(os.getenv("UPSTREAM_BURST_FRACTION", "1"))
+
+# Requests/tokens per minute by model; 0 = unknown, rely on the adaptive limit.
+# Override with UPSTREAM_QUOTAS='{"gpt-4o-mini": {"rpm": 500, "tpm": 200000}}'
+DEFAULT_QUOTAS = {
+    "gpt-4o-mini": {"rpm": 500, "tpm": 200000},
+    "dall-e-3": {"rpm": 7, "tpm": 0},
+    "tts-1": {"rpm": 50, "tpm": 0},
+}
+QUOTAS = {**DEFAULT_QUOTAS, **json.loads(os.getenv("UPSTREAM_QUOTAS", "{}"))}
+
+BACKOFF_BASE = 0.25
+BACKOFF_CAP = 8.0
+DECREASE_FACTOR = 0.5
+LATENCY_DECREASE_FACTOR = 0.9
+LATENCY_TOLERANCE = 2.0  # recent latency above this multiple of the long-run average is congestion
+SHORT_ALPHA = 0.3
+LONG_ALPHA = 0.02
+DECREASE_COOLDOWN = 1.0  # one burst of 429s should halve the limit once, not many times
+
+# Congestion errors shrink the limit; all of these are retried
+CONGESTION_ERRORS = (openai.RateLimitError,)
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.InternalServerError,
+                    openai.APIConnectionError)  # APITimeoutError is a subclass of APIConnectionError
+
+
+class UpstreamBusy(Exception):
+    """The call could not be made before its deadline."""
+
+    def __init__(self, model, retry_after):
+        super().__init__(f"Upstream model '{model}' is busy, retry later")
+        self.retry_after = retry_after
+
+
+def estimate_tokens(messages, max_tokens=0):
+    """Rough token count for the quota: ~4 characters per token plus the completion budget."""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst_fraction=UPSTREAM_BURST_FRACTION):
+        self.rate = per_minute / 60
+        self.capacity = max(1.0, per_minute * burst_fraction)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount, deadline):
+        # Requests bigger than the bucket wait for a full bucket and go into debt
+        amount = min(amount, self.capacity)
+        async with self.lock:  # FIFO: a big request isn't starved by small ones
+            while True:
+                self.refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+                if time.monotonic() + wait > deadline:
+                    raise TimeoutError
+                await asyncio.sleep(wait)
+
+    def adjust(self, delta):
+        """Correct an estimate once the real cost is known (negative delta refunds)."""
+        self.refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit."""
+
+    def __init__(self, initial, maximum=UPSTREAM_MAX_CONCURRENCY):
+        self.limit = float(initial)
+        self.maximum = maximum
+        self.in_flight = 0
+        self.recent_latency = None
+        self.baseline_latency = None
+        self.last_decrease = 0.0
+        self.changed = asyncio.Condition()
+
+    async def acquire(self, deadline):
+        async with self.changed:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError
+                try:
+                    await asyncio.wait_for(self.changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    raise TimeoutError from None
+            self.in_flight += 1
+
+    async def release(self, latency=None, congested=False):
+        async with self.changed:
+            self.in_flight -= 1
+            if congested:
+                self.decrease(DECREASE_FACTOR)
+            elif latency is not None:
+                if self.baseline_latency is None:
+                    self.recent_latency = self.baseline_latency = latency
+                self.recent_latency += SHORT_ALPHA * (latency - self.recent_latency)
+                self.baseline_latency += LONG_ALPHA * (latency - self.baseline_latency)
+                if self.recent_latency > self.baseline_latency * LATENCY_TOLERANCE:
+                    self.decrease(LATENCY_DECREASE_FACTOR)
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self.changed.notify_all()
+
+    def decrease(self, factor):
+        now = time.monotonic()
+        if now - self.last_decrease >= DECREASE_COOLDOWN:
+            self.limit = max(1.0, self.limit * factor)
+            self.last_decrease = now
+
+
+class ModelLane:
+    def __init__(self, quota):
+        self.requests = TokenBucket(quota["rpm"]) if quota.get("rpm") else None
+        self.tokens = TokenBucket(quota["tpm"]) if quota.get("tpm") else None
+        # Start at what the request quota sustains for ~1s calls, then let AIMD find the level
+        initial = max(1, min(UPSTREAM_MAX_CONCURRENCY, quota.get("rpm", 0) // 60 or 8))
+        self.concurrency = AdaptiveLimit(initial)
+        self.stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0, "deadline_exceeded": 0}
+
+
+class UpstreamScheduler:
+    def __init__(self, enabled=UPSTREAM_SCHEDULER, quotas=QUOTAS, deadline=UPSTREAM_DEADLINE,
+                 max_retries=UPSTREAM_MAX_RETRIES):
+        self.enabled = enabled
+        self.quotas = quotas
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.lanes = {}
+
+    def lane(self, model):
+        lane = self.lanes.get(model)
+        if lane is None:
+            lane = self.lanes[model] = ModelLane(self.quotas.get(model, {}))
+        return lane
+
+    @asynccontextmanager
+    async def slot(self, model, tokens=0, deadline=None, measure_latency=True):
+        """Hold one admitted call's worth of quota and concurrency for the block.
+
+        Pass measure_latency=False for blocks that consume a whole stream,
+        whose duration says more about the output length than about load.
+        """
+        if not self.enabled:
+            yield
+            return
+        lane = self.lane(model)
+        deadline = deadline or time.monotonic() + self.deadline
+        try:
+            if lane.requests:
+                await lane.requests.acquire(1, deadline)
+            if lane.tokens and tokens:
+                await lane.tokens.acquire(tokens, deadline)
+            await lane.concurrency.acquire(deadline)
+        except TimeoutError:
+            lane.stats["deadline_exceeded"] += 1
+            raise UpstreamBusy(model, self.retry_after(lane)) from None
+
+        lane.stats["calls"] += 1
+        start = time.monotonic()
+        try:
+            yield
+        except CONGESTION_ERRORS:
+            lane.stats["rate_limited"] += 1
+            await lane.concurrency.release(congested=True)
+            raise
+        except BaseException:
+            await lane.concurrency.release()
+            raise
+        await lane.concurrency.release(latency=time.monotonic() - start if measure_latency else None)
+
+    async def call(self, model, func, tokens=0):
+        """Run `await func()` under the model's limits, retrying transient failures until the deadline."""
+        if not self.enabled:
+            return await func()
+        lane = self.lane(model)
+        deadline = time.monotonic() + self.deadline
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.slot(model, tokens, deadline):
+                    return await func()
+            except RETRYABLE_ERRORS as e:
+                delay = self.backoff(attempt, e)
+                if attempt == self.max_retries or time.monotonic() + delay > deadline:
+                    lane.stats["failures"] += 1
+                    raise
+                lane.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    def backoff(self, attempt, error):
+        # Full jitter, but never sooner than the server's Retry-After
+        delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                delay = max(delay, float(response.headers.get("retry-after", 0)))
+            except ValueError:
+                pass
+        return delay
+
+    def record_tokens(self, model, estimated, actual):
+        lane = self.lanes.get(model)
+        if self.enabled and lane and lane.tokens and actual is not None:
+            lane.tokens.adjust(actual - estimated)
+
+    def retry_after(self, lane):
+        if lane.requests and lane.requests.rate:
+            return max(1, round(1 / lane.requests.rate))
+        return 1
+
+    def report(self):
+        return {
+            model: {
+                **lane.stats,
+                "concurrency_limit": round(lane.concurrency.limit, 2),
+                "in_flight": lane.concurrency.in_flight,
+                "baseline_latency_ms": round(lane.concurrency.baseline_latency * 1000, 1)
+                                       if lane.concurrency.baseline_latency else None,
+                "quota": self.quotas.get(model, {}),
+            }
+            for model, lane in self.lanes.items()
+        }
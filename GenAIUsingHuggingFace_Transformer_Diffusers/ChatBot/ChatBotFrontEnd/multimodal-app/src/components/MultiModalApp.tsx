@@ -11,7 +11,10 @@ interface Result {
   original?: string;
   file_path?: string;
   image_data?: string;
+  image_url?: string;
+  variants?: { webp?: string; thumbnail?: string };
   audio_data?: string;
+  stream_url?: string;
 }
 
 interface Example {
@@ -19,11 +22,19 @@ interface Example {
   text: string;
 }
 
+interface StreamMetadata {
+  cached: boolean;
+  model?: string;
+  first_token_ms?: number;
+  total_ms?: number;
+}
+
 const MultiModalApp: React.FC = () => {
   const [prompt, setPrompt] = useState<string>('');
   const [loading, setLoading] = useState<boolean>(false);
   const [result, setResult] = useState<Result | null>(null);
   const [error, setError] = useState<string | null>(null);
+  const [metadata, setMetadata] = useState<StreamMetadata | null>(null);
 
   const examples: Example[] = [
     { label: 'Text', text: 'Tell me a story about a robot learning to paint' },
@@ -32,6 +43,40 @@ const MultiModalApp: React.FC = () => {
     { label: 'Translation', text: 'Translate to Marathi: How are you today?' }
   ];
 
+  // Parse a Server-Sent Events body and hand each event to onEvent as it arrives
+  const readEventStream = async (
+    response: Response,
+    onEvent: (event: string, data: any) => void
+  ): Promise<void> => {
+    if (!response.body) {
+      throw new Error('Streaming is not supported by this browser');
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        let event = 'message';
+        let data = '';
+        for (const line of block.split('\n')) {
+          if (line.startsWith('event:')) event = line.slice(6).trim();
+          else if (line.startsWith('data:')) data += line.slice(5).trim();
+        }
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  };
+
   const processPrompt = async (): Promise<void> => {
     if (!prompt.trim()) {
       setError('Please enter a prompt');
@@ -41,12 +86,14 @@ const MultiModalApp: React.FC = () => {
     setLoading(true);
     setError(null);
     setResult(null);
+    setMetadata(null);
 
     try {
-      const response = await fetch(`${API_URL}/process`, {
+      const response = await fetch(`${API_URL}/process/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ prompt: prompt.trim() })
+        // Ask for a /media URL instead of a base64 data URI for images
+        body: JSON.stringify({ prompt: prompt.trim(), response_mode: 'url' })
       });
 
       if (!response.ok) {
@@ -54,9 +101,28 @@ const MultiModalApp: React.FC = () => {
         throw new Error(errorData.detail || 'Failed to process request');
       }
 
-      const data: Result = await response.json();
-      console.log('Response data:', data);
-      setResult(data);
+      await readEventStream(response, (event, data) => {
+        switch (event) {
+          case 'intent':
+            // Text and translation render progressively; image/audio wait for 'result'
+            if (data.type === 'text' || data.type === 'translation') {
+              setResult({ intent: data.intent, type: data.type, result: '', original: data.original });
+            }
+            break;
+          case 'token':
+            setResult(prev => (prev ? { ...prev, result: prev.result + data.delta } : prev));
+            break;
+          case 'result':
+            console.log('Response data:', data);
+            setResult(data);
+            break;
+          case 'done':
+            setMetadata(data);
+            break;
+          case 'error':
+            throw new Error(data.detail || 'Failed to process request');
+        }
+      });
     } catch (err) {
       console.error('Error:', err);
       setError(err instanceof Error ? err.message : 'An error occurred');
@@ -69,6 +135,7 @@ const MultiModalApp: React.FC = () => {
     setPrompt('');
     setResult(null);
     setError(null);
+    setMetadata(null);
   };
 
   const fillExample = (text: string): void => {
@@ -144,7 +211,7 @@ const MultiModalApp: React.FC = () => {
           </div>
 
           {/* Loading State */}
-          {loading && (
+          {loading && !result && (
             <div className="loading-container">
               <Loader2 className="loading-spinner" />
               <span className="loading-text">Processing your request...</span>
@@ -207,7 +274,9 @@ const MultiModalApp: React.FC = () => {
                       />
                     ) : (
                       <img
-                        src={`${API_URL}/${result.file_path?.replace(/\\/g, '/')}`}
+                        src={result.image_url
+                          ? `${API_URL}${result.image_url}`
+                          : `${API_URL}/${result.file_path?.replace(/\\/g, '/')}`}
                         alt="Generated"
                         className="result-image"
                         onError={() => console.error('Image failed to load from path')}
@@ -234,6 +303,18 @@ const MultiModalApp: React.FC = () => {
                         <source src={result.audio_data} type="audio/mpeg" />
                         Your browser does not support audio playback.
                       </audio>
+                    ) : result.stream_url ? (
+                      // Plays while the speech is still being generated; once finished the
+                      // same URL serves the saved file, so seeking and replay work too
+                      <audio
+                        controls
+                        autoPlay
+                        className="result-audio"
+                        onError={handleAudioError}
+                        src={`${API_URL}${result.stream_url}`}
+                      >
+                        Your browser does not support audio playback.
+                      </audio>
                     ) : (
                       <audio
                         controls
@@ -248,6 +329,14 @@ const MultiModalApp: React.FC = () => {
                   </>
                 )}
               </div>
+
+              {metadata && (
+                <div className="result-meta">
+                  {metadata.cached ? 'Served from cache' : metadata.model}
+                  {metadata.first_token_ms !== undefined && ` · first token ${metadata.first_token_ms} ms`}
+                  {metadata.total_ms !== undefined && ` · total ${metadata.total_ms} ms`}
+                </div>
+              )}
             </div>
           )}
 
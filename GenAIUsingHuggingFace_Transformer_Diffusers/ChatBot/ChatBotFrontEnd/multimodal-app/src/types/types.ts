@@ -7,7 +7,10 @@ export interface Result {
   original?: string;
   file_path?: string;
   image_data?: string;
+  image_url?: string;
+  variants?: { webp?: string; thumbnail?: string };
   audio_data?: string;
+  stream_url?: string;
 }
 
 export interface Example {
@@ -22,7 +25,17 @@ export interface ApiResponse {
   original?: string;
   file_path?: string;
   image_data?: string;
+  image_url?: string;
+  variants?: { webp?: string; thumbnail?: string };
   audio_data?: string;
+  stream_url?: string;
+}
+
+export interface StreamMetadata {
+  cached: boolean;
+  model?: string;
+  first_token_ms?: number;
+  total_ms?: number;
 }
 
 export interface ApiErrorResponse {
@@ -31,4 +44,5 @@ export interface ApiErrorResponse {
 
 export interface ProcessRequest {
   prompt: string;
+  response_mode?: 'inline' | 'url';
 }
\ No newline at end of file